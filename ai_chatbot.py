@@ -1,25 +1,107 @@
 import streamlit as st
-import pickle
 import json
-import pandas as pd
 from groq import Groq
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from intake import IntakeMachine
+from scoring import ADVERSE_CLASS, Scorer
+from llm_gateway import GroqBackend, LLMGateway
 
 
-client = Groq(api_key="api_key")
 MODEL = 'llama3-groq-70b-8192-tool-use-preview'
 
+# One pooled LLM client and answer cache per server process, shared by all sessions and reruns.
+# LLM_BASE_URL points it at another endpoint, e.g. the offline stand-in in benchmarks/llm_standin.py
+@st.cache_resource
+def get_llm_gateway():
+    client = Groq(api_key="api_key", base_url=os.environ.get('LLM_BASE_URL'))
+    return LLMGateway(GroqBackend(client, MODEL))
+
 # Define valid options for categorical fields
 VALID_HOME_OWNERSHIP = ["RENT", "MORTGAGE", "OWN", "OTHER"]
 VALID_LOAN_INTENT = ["MEDICAL", "DEBTCONSOLIDATION", "HOMEIMPROVEMENT", "VENTURE", "PERSONAL", "EDUCATION"]
 VALID_LOAN_GRADE = ["A", "B", "C", "D", "E", "F", "G"]
 VALID_DEFAULT = ["Y", "N"]
 
+# Intake schema, asked in this order; see intake.py for the keys. labels/suffixes/free
+# let one message answer several questions ("age 30, income 52k, I rent").
+INTAKE_FIELDS = [
+    {'name': 'person_age', 'label': 'Age', 'type': int, 'min': 18, 'max': 100,
+     'prompt': "What is your age?",
+     'range_error': "Please enter a valid age between 18 and 100.",
+     'type_error': "Please enter a valid numeric age.",
+     'labels': ['age', 'aged'], 'suffixes': [r'years?\s+old', r'y/?o\b']},
+    {'name': 'person_income', 'label': 'Income', 'type': int, 'min': 1,
+     'prompt': "What is your annual income in dollars?",
+     'range_error': "Please enter a valid positive income amount.",
+     'type_error': "Please enter a valid numeric income amount.",
+     'labels': ['income', 'salary', 'earn', 'make']},
+    {'name': 'person_home_ownership', 'label': 'Home ownership', 'choices': VALID_HOME_OWNERSHIP,
+     'prompt': f"What is your home ownership status? Please choose from: {', '.join(VALID_HOME_OWNERSHIP)}",
+     'range_error': f"Please enter a valid home ownership status: {', '.join(VALID_HOME_OWNERSHIP)}",
+     'labels': ['home ownership', 'ownership', 'housing'],
+     'synonyms': {'renting': 'RENT', 'renter': 'RENT', 'mortgaged': 'MORTGAGE'},
+     'free': ['rent', 'renting', 'renter', 'mortgage', 'mortgaged']},
+    {'name': 'person_emp_length', 'label': 'Employment length', 'type': int, 'min': 0, 'max': 50,
+     'prompt': "How many years have you been employed? (Enter a number)",
+     'range_error': "Please enter a valid employment length between 0 and 50 years.",
+     'type_error': "Please enter a valid number for employment length.",
+     'labels': ['employed', 'employment', 'employment length', 'working', 'worked'],
+     'suffixes': [r'years?\s+(?:of\s+)?(?:employment|employed|working|at\s+(?:my\s+)?job)']},
+    {'name': 'loan_intent', 'label': 'Loan purpose', 'choices': VALID_LOAN_INTENT,
+     'prompt': f"What is the purpose of the loan? Please choose from: {', '.join(VALID_LOAN_INTENT)}",
+     'range_error': f"Please enter a valid loan purpose: {', '.join(VALID_LOAN_INTENT)}",
+     'labels': ['purpose', 'intent'],
+     'synonyms': {'debt consolidation': 'DEBTCONSOLIDATION', 'home improvement': 'HOMEIMPROVEMENT'},
+     'free': ['medical', 'debt consolidation', 'debtconsolidation', 'home improvement', 'homeimprovement',
+              'venture', 'personal', 'education']},
+    {'name': 'loan_grade', 'label': 'Loan grade', 'choices': VALID_LOAN_GRADE,
+     'prompt': f"What is the loan grade? Please choose from: {', '.join(VALID_LOAN_GRADE)}",
+     'range_error': f"Please enter a valid loan grade: {', '.join(VALID_LOAN_GRADE)}",
+     'labels': ['grade']},
+    {'name': 'loan_amnt', 'label': 'Loan amount', 'type': int, 'min': 1,
+     'prompt': "What is the requested loan amount in dollars?",
+     'range_error': "Please enter a valid positive loan amount.",
+     'type_error': "Please enter a valid numeric loan amount.",
+     'labels': ['loan amount', 'amount', 'borrow', 'loan of']},
+    {'name': 'loan_int_rate', 'label': 'Interest rate', 'type': float, 'min': 0, 'max': 100,
+     'prompt': "What is the interest rate of the loan (as a percentage)?",
+     'range_error': "Please enter a valid interest rate between 0 and 100.",
+     'type_error': "Please enter a valid numeric interest rate.",
+     'labels': ['interest rate', 'interest', 'rate', 'apr'], 'suffixes': ['%', r'percent\b']},
+    {'name': 'cb_person_default_on_file', 'label': 'Prior defaults', 'choices': VALID_DEFAULT,
+     'prompt': "Do you have any defaults on file? (Y/N)",
+     'range_error': "Please enter Y for Yes or N for No.",
+     'labels': ['defaults on file', 'default on file', 'prior defaults', 'defaults', 'default'],
+     'synonyms': {'yes': 'Y', 'no': 'N'}, 'suffixes': [r'(?:prior\s+)?defaults?\b']},
+    {'name': 'cb_person_cred_hist_length', 'label': 'Credit history', 'type': int, 'min': 0, 'max': 60,
+     'prompt': "How many years of credit history do you have?",
+     'range_error': "Please enter a valid credit history length between 0 and 60 years.",
+     'type_error': "Please enter a valid number for credit history length.",
+     'labels': ['credit history', 'history'], 'suffixes': [r'years?\s+of\s+credit']},
+]
+
+# Earlier turns than this are collapsed into one transcript block, so a rerun draws a
+# fixed number of chat elements however long the session is
+HISTORY_WINDOW = 20
+
+@st.cache_resource
+def get_intake_machine():
+    return IntakeMachine(INTAKE_FIELDS)
+
+# Background thread that pre-scores likely applicants into the prediction cache
+@st.cache_resource
+def get_speculation_pool():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='speculative-scoring')
+
+@st.cache_resource
+def get_scorer():
+    return Scorer()
+
 def load_model():
     try:
-        with open('loan_model.pkl', 'rb') as file:
-            model = pickle.load(file)
-        return model
+        return get_scorer()
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
         return None
@@ -28,11 +110,7 @@ def predict_default_risk(person_age, person_income, person_home_ownership, perso
                         loan_intent, loan_grade, loan_amnt, loan_int_rate,
                         cb_person_default_on_file, cb_person_cred_hist_length, loan_percent_income):
     try:
-        model = load_model()
-        if model is None:
-            return {"error": "Model loading failed"}
-        
-        user_input = pd.DataFrame([{
+        applicant = {
             'person_age': person_age,
             'person_income': person_income,
             'person_home_ownership': person_home_ownership,
@@ -44,18 +122,137 @@ def predict_default_risk(person_age, person_income, person_home_ownership, perso
             'cb_person_default_on_file': cb_person_default_on_file,
             'cb_person_cred_hist_length': cb_person_cred_hist_length,
             'loan_percent_income': loan_percent_income,
-        }])
+        }
+
+        scorer = load_model()
+        if scorer is None:
+            return {"error": "Model loading failed"}
         
-        prediction = model.predict(user_input)[0]
+        # Class, calibrated default probability and risk band from one (cached) model call
+        result = scorer.score_records([applicant])[0]
         
+        default = result['prediction'] == ADVERSE_CLASS
         return {
-            "default_prediction": bool(prediction),
-            "input_data": user_input.to_dict(orient='records')[0],
-            "message": "High Default Risk" if prediction else "Low Default Risk"
+            "default_prediction": default,
+            "default_probability": result['probability'],
+            "risk_band": result['risk_band'],
+            "reasons": result['reasons'],
+            "input_data": applicant,
+            "message": "High Default Risk" if default else "Low Default Risk"
         }
     except Exception as e:
         return {"error": f"Failed to process default risk prediction: {str(e)}"}
 
+def with_derived_fields(collected):
+    # loan_percent_income is not asked for; it follows from the loan amount and income
+    applicant = dict(collected)
+    applicant['loan_percent_income'] = (applicant['loan_amnt'] / applicant['person_income']) * 100
+    return applicant
+
+def speculate(machine, collected):
+    """Pre-score every completion of the one remaining field, if it is enumerable.
+
+    Runs in the background while the user types the last answer; the final
+    predict_default_risk call then finds its result in the prediction cache.
+    """
+    missing = [name for name in machine.order if name not in collected]
+    if len(missing) != 1:
+        return
+    values = machine.candidates(missing[0])
+    scorer = load_model()
+    if not values or scorer is None:
+        return
+    records = [with_derived_fields({**collected, missing[0]: value}) for value in values]
+    get_speculation_pool().submit(scorer.score_records, records)
+
+# Display names for reason codes; loan_percent_income is derived, so it isn't an intake field
+REASON_LABELS = dict({field['name']: field['label'] for field in INTAKE_FIELDS},
+                     loan_percent_income='Loan as % of income')
+
+def format_reasons(reasons):
+    return ', '.join(REASON_LABELS.get(reason['field'], reason['field']) for reason in reasons)
+
+def format_assessment(result, data):
+    reasons = f"\n    Main factors: {format_reasons(result['reasons'])}\n" \
+        if result['default_prediction'] and result['reasons'] else ''
+    return f"""
+    📊 **Default Risk Assessment Results**
+
+    {'🔴 High Default Risk' if result['default_prediction'] else '🟢 Low Default Risk'}
+
+    Default probability: {result['default_probability']:.1%} (risk band: {result['risk_band']})
+{reasons}
+    ### **Personal Details:**
+    - Age: {data['person_age']} years
+    - Income: ${data['person_income']:,}
+    - Home Ownership: {data['person_home_ownership']}
+    - Employment Length: {data['person_emp_length']} years
+
+    ### **Loan Details:**
+    - Loan Amount: ${data['loan_amnt']:,}
+    - Interest Rate: {data['loan_int_rate']}%
+    - Loan Purpose: {data['loan_intent']}
+    - Loan Grade: {data['loan_grade']}
+
+    ### **Credit Details:**
+    - Prior Defaults: {'Yes' if data['cb_person_default_on_file'] == 'Y' else 'No'}
+    - Credit History Length: {data['cb_person_cred_hist_length']} years
+    - Loan as % of Income: {data['loan_percent_income']:.1f}%
+
+    Would you like to assess another loan scenario? Say 'yes' to start over, or feel free to ask any loan-related questions!
+    """
+
+def intake_turn(prompt):
+    """Advance the intake state machine with one message and return the reply."""
+    machine = get_intake_machine()
+    collected = st.session_state.collected_data
+    updates, errors = machine.step(collected, prompt)
+    collected.update(updates)
+    st.session_state.current_field = machine.next_field(collected)
+
+    if st.session_state.current_field is None:
+        st.session_state.collected_data = with_derived_fields(collected)
+        result = predict_default_risk(**st.session_state.collected_data)
+        if "error" in result:
+            return f"⚠️ Error: {result['error']}"
+        st.session_state.prediction_made = True
+        return format_assessment(result, st.session_state.collected_data)
+
+    if errors and not updates:
+        return "\n\n".join(errors)
+    speculate(machine, collected)
+    parts = list(errors)
+    if len(updates) > 1:
+        noted = ', '.join(f"{machine.schema[name]['label'].lower()} {value}" for name, value in updates.items())
+        parts.insert(0, f"Got it: {noted}.")
+    parts.append(machine.prompt(st.session_state.current_field))
+    return "\n\n".join(parts)
+
+def render_history():
+    """Draw the chat so a rerun costs the same however long the session is.
+
+    The last HISTORY_WINDOW messages are drawn as chat bubbles; older ones are
+    appended once to a transcript that is drawn as a single collapsed block.
+    """
+    messages = st.session_state.messages
+    window_start = max(1, len(messages) - HISTORY_WINDOW)  # messages[0] is the system prompt
+    transcript = st.session_state.transcript
+    while st.session_state.transcript_upto < window_start:
+        message = messages[st.session_state.transcript_upto]
+        transcript.append(f"**{message['role'].title()}:** {message['content']}")
+        st.session_state.transcript_upto += 1
+    if transcript:
+        with st.expander(f"Earlier messages ({len(transcript)})"):
+            st.markdown("\n\n".join(transcript))
+    for message in messages[window_start:]:
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
+
+def reset_intake():
+    st.session_state.collected_data = {}
+    st.session_state.current_field = get_intake_machine().order[0]
+    st.session_state.prediction_made = False
+
 def show():
     st.title("🤖 Loan Default Risk Prediction (GenAI Chatbot)")
     st.markdown("""
@@ -73,18 +270,15 @@ def show():
             },
             {
                 "role": "assistant",
-                "content": "Hello! I'm your loan default risk assessment assistant. I'll help evaluate the default risk by asking some questions. First, what is your age?"
+                "content": "Hello! I'm your loan default risk assessment assistant. I'll help evaluate the default risk by asking some questions. "
+                           "You can answer one at a time or give several details at once. First, what is your age?"
             }
         ]
-        st.session_state.collected_data = {}
-        st.session_state.current_field = 'person_age'
-        st.session_state.prediction_made = False
+        st.session_state.transcript = []
+        st.session_state.transcript_upto = 1
+        reset_intake()
 
-    # Display chat history
-    for message in st.session_state.messages:
-        if message["role"] != "system":
-            with st.chat_message(message["role"]):
-                st.write(message["content"])
+    render_history()
 
     # Handle user input
     prompt = st.chat_input("Type your message here...")
@@ -96,12 +290,11 @@ def show():
         with st.chat_message("assistant"):
             with st.spinner("Processing..."):
                 try:
+                    streamed = False
                     # Handle post-prediction conversation
                     if st.session_state.prediction_made:
                         if prompt.lower() in ['yes', 'y', 'sure', 'start over', 'new']:
-                            st.session_state.collected_data = {}
-                            st.session_state.current_field = 'person_age'
-                            st.session_state.prediction_made = False
+                            reset_intake()
                             response = "Great! Let's start a new default risk assessment. What is your age?"
                         else:
                             messages = [
@@ -109,162 +302,15 @@ def show():
                                 lending, credit, and financial matters. Keep responses focused on loan-related topics."""},
                                 {"role": "user", "content": prompt}
                             ]
-                            llm_response = client.chat.completions.create(
-                                model=MODEL,
-                                messages=messages,
-                                max_tokens=500
-                            )
-                            response = llm_response.choices[0].message.content
+                            # Stream tokens into the chat as they arrive (cached answers appear at once)
+                            response = st.write_stream(get_llm_gateway().stream(messages, max_tokens=500))
+                            streamed = True
                     else:
-                        current_field = st.session_state.current_field
-                        response = None
-
-                        # Process user input based on current field
-                        if current_field == 'person_age':
-                            try:
-                                age = int(prompt)
-                                if 18 <= age <= 100:
-                                    st.session_state.collected_data['person_age'] = age
-                                    st.session_state.current_field = 'person_income'
-                                    response = "Great! Now, what is your annual income in dollars?"
-                                else:
-                                    response = "Please enter a valid age between 18 and 100."
-                            except ValueError:
-                                response = "Please enter a valid numeric age."
-
-                        elif current_field == 'person_income':
-                            try:
-                                income = int(prompt)
-                                if income > 0:
-                                    st.session_state.collected_data['person_income'] = income
-                                    st.session_state.current_field = 'person_home_ownership'
-                                    response = f"What is your home ownership status? Please choose from: {', '.join(VALID_HOME_OWNERSHIP)}"
-                                else:
-                                    response = "Please enter a valid positive income amount."
-                            except ValueError:
-                                response = "Please enter a valid numeric income amount."
-
-                        elif current_field == 'person_home_ownership':
-                            if prompt.upper() in VALID_HOME_OWNERSHIP:
-                                st.session_state.collected_data['person_home_ownership'] = prompt.upper()
-                                st.session_state.current_field = 'person_emp_length'
-                                response = "How many years have you been employed? (Enter a number)"
-                            else:
-                                response = f"Please enter a valid home ownership status: {', '.join(VALID_HOME_OWNERSHIP)}"
-
-                        elif current_field == 'person_emp_length':
-                            try:
-                                emp_length = int(prompt)
-                                if 0 <= emp_length <= 50:
-                                    st.session_state.collected_data['person_emp_length'] = emp_length
-                                    st.session_state.current_field = 'loan_intent'
-                                    response = f"What is the purpose of the loan? Please choose from: {', '.join(VALID_LOAN_INTENT)}"
-                                else:
-                                    response = "Please enter a valid employment length between 0 and 50 years."
-                            except ValueError:
-                                response = "Please enter a valid number for employment length."
-
-                        elif current_field == 'loan_intent':
-                            if prompt.upper() in VALID_LOAN_INTENT:
-                                st.session_state.collected_data['loan_intent'] = prompt.upper()
-                                st.session_state.current_field = 'loan_grade'
-                                response = f"What is the loan grade? Please choose from: {', '.join(VALID_LOAN_GRADE)}"
-                            else:
-                                response = f"Please enter a valid loan purpose: {', '.join(VALID_LOAN_INTENT)}"
-
-                        elif current_field == 'loan_grade':
-                            if prompt.upper() in VALID_LOAN_GRADE:
-                                st.session_state.collected_data['loan_grade'] = prompt.upper()
-                                st.session_state.current_field = 'loan_amnt'
-                                response = "What is the requested loan amount in dollars?"
-                            else:
-                                response = f"Please enter a valid loan grade: {', '.join(VALID_LOAN_GRADE)}"
-
-                        elif current_field == 'loan_amnt':
-                            try:
-                                loan_amount = int(prompt)
-                                if loan_amount > 0:
-                                    st.session_state.collected_data['loan_amnt'] = loan_amount
-                                    st.session_state.current_field = 'loan_int_rate'
-                                    response = "What is the interest rate of the loan (as a percentage)?"
-                                else:
-                                    response = "Please enter a valid positive loan amount."
-                            except ValueError:
-                                response = "Please enter a valid numeric loan amount."
-
-                        elif current_field == 'loan_int_rate':
-                            try:
-                                interest_rate = float(prompt)
-                                if 0 <= interest_rate <= 100:
-                                    st.session_state.collected_data['loan_int_rate'] = interest_rate
-                                    st.session_state.current_field = 'cb_person_default_on_file'
-                                    response = "Do you have any defaults on file? (Y/N)"
-                                else:
-                                    response = "Please enter a valid interest rate between 0 and 100."
-                            except ValueError:
-                                response = "Please enter a valid numeric interest rate."
-
-                        elif current_field == 'cb_person_default_on_file':
-                            if prompt.upper() in VALID_DEFAULT:
-                                st.session_state.collected_data['cb_person_default_on_file'] = prompt.upper()
-                                st.session_state.current_field = 'cb_person_cred_hist_length'
-                                response = "How many years of credit history do you have?"
-                            else:
-                                response = "Please enter Y for Yes or N for No."
-
-                        elif current_field == 'cb_person_cred_hist_length':
-                            try:
-                                credit_history = int(prompt)
-                                if 0 <= credit_history <= 60:
-                                    st.session_state.collected_data['cb_person_cred_hist_length'] = credit_history
-                                    
-                                    # Calculate loan_percent_income automatically
-                                    loan_amount = st.session_state.collected_data['loan_amnt']
-                                    income = st.session_state.collected_data['person_income']
-                                    loan_percent_income = (loan_amount / income) * 100
-                                    st.session_state.collected_data['loan_percent_income'] = loan_percent_income
-                                    
-                                    # Make prediction
-                                    result = predict_default_risk(**st.session_state.collected_data)
-                                    
-                                    if "error" not in result:
-                                        response = f"""
-                                        📊 **Default Risk Assessment Results**
-
-                                        {'🔴 High Default Risk' if result['default_prediction'] else '🟢 Low Default Risk'}
-
-                                        ### **Personal Details:**
-                                        - Age: {st.session_state.collected_data['person_age']} years
-                                        - Income: ${st.session_state.collected_data['person_income']:,}
-                                        - Home Ownership: {st.session_state.collected_data['person_home_ownership']}
-                                        - Employment Length: {st.session_state.collected_data['person_emp_length']} years
-
-                                        ### **Loan Details:**
-                                        - Loan Amount: ${st.session_state.collected_data['loan_amnt']:,}
-                                        - Interest Rate: {st.session_state.collected_data['loan_int_rate']}%
-                                        - Loan Purpose: {st.session_state.collected_data['loan_intent']}
-                                        - Loan Grade: {st.session_state.collected_data['loan_grade']}
-
-                                        ### **Credit Details:**
-                                        - Prior Defaults: {'Yes' if st.session_state.collected_data['cb_person_default_on_file'] == 'Y' else 'No'}
-                                        - Credit History Length: {st.session_state.collected_data['cb_person_cred_hist_length']} years
-                                        - Loan as % of Income: {loan_percent_income:.1f}%
-
-                                        Would you like to assess another loan scenario? Say 'yes' to start over, or feel free to ask any loan-related questions!
-                                        """
-                                        st.session_state.prediction_made = True
-                                    else:
-                                        response = f"⚠️ Error: {result['error']}"
-                                else:
-                                    response = "Please enter a valid credit history length between 0 and 60 years."
-                            except ValueError:
-                                response = "Please enter a valid number for credit history length."
-
-                        else:
-                            response = "An error occurred. Please start over."
+                        response = intake_turn(prompt)
 
                     if response:
-                        st.write(response)
+                        if not streamed:
+                            st.write(response)
                         st.session_state.messages.append({"role": "assistant", "content": response})
 
                 except Exception as e:
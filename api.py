@@ -1,37 +1,335 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+import numpy as np
 import pandas as pd
-import pickle
+import json
+import io
+import math
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from train_model import numeric_features, categorical_features
+from batching import MicroBatcher
+from scoring import ADVERSE_CLASS, Scorer, UnknownProductError, default_model_path
+from metrics import ERRORS, MODEL_INFO, REGISTRY, REQUESTS, REQUEST_SECONDS
+from profiling import SlowRequestProfiler
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Load the trained model
-with open('loan_model.pkl', 'rb') as model_file:
-    model = pickle.load(model_file)
+# Maximum number of applicants accepted by a single /predict/batch call
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+
+# Micro-batching of concurrent /predict requests (set BATCH_WINDOW_MS=0 to disable)
+BATCH_WINDOW_MS = float(os.environ.get('BATCH_WINDOW_MS', 2.0))
+BATCH_MAX_ROWS = int(os.environ.get('BATCH_MAX_ROWS', 64))
+# Seconds a /predict request waits for its micro-batch before answering 503
+BATCH_TIMEOUT_S = float(os.environ.get('BATCH_TIMEOUT_S', 10.0))
+
+# Model artifact: a versioned directory that is hash-checked and memory-mapped (loan_model_fast
+# when it exists), or a pickled pipeline
+MODEL_PATH = os.environ.get('MODEL_PATH') or default_model_path()
+
+# Sampling profiler for slow requests: PROFILE_SLOW_MS=250 keeps a flame graph (folded stacks,
+# in PROFILE_DIR) of every request slower than 250 ms; unset or 0 turns it off
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5.0))
+
+# Applicant scored once after every model load, before the process reports ready
+WARM_UP_RECORD = {
+    'person_age': 22, 'person_income': 59000, 'person_home_ownership': 'RENT', 'person_emp_length': 123,
+    'loan_intent': 'PERSONAL', 'loan_grade': 'D', 'loan_amnt': 35000, 'loan_int_rate': 16.02,
+    'loan_percent_income': 0.59, 'cb_person_default_on_file': 'Y', 'cb_person_cred_hist_length': 3
+}
+
+# Load the trained model (with its calibration, product thresholds and prediction cache)
+# and score the warm-up applicant, so the first real request doesn't pay for lazy setup
+def load_scorer():
+    candidate = Scorer(MODEL_PATH)
+    candidate.raw_scores([WARM_UP_RECORD])
+    return candidate
+
+scorer = load_scorer()
+model = scorer.model
+
+# Swap in a new model version; if it fails to load, the current one keeps serving
+def reload_model():
+    global scorer, model
+    candidate = load_scorer()
+    if candidate.model_version != scorer.model_version:
+        MODEL_INFO.remove(**scorer.model_labels)
+    scorer, model = candidate, candidate.model
+
+# Function to make predictions (a DataFrame of applicants, for either model form). The class
+# is decided like /predict's: calibrated probability against the product's threshold.
+def predict_loan_eligibility(input_data, product='default'):
+    if scorer.compiled:
+        proba = model.predict_proba(model.encode_frame(input_data))
+    else:
+        proba = model.predict_proba(input_data)
+    results = scorer.finalize(proba[:, scorer.positive], product)
+    return np.array([result['prediction'] for result in results])
+
+# Single-row requests are coalesced by the micro-batcher into one forest pass. It is created by
+# the first request that needs it, so a pre-forking server's master (which imports this module
+# but serves nothing) never starts its thread; each worker starts its own.
+batcher = None
+batcher_lock = threading.Lock()
+
+def get_batcher():
+    global batcher
+    if BATCH_WINDOW_MS <= 0:
+        return None
+    with batcher_lock:
+        if batcher is None:
+            batcher = MicroBatcher(lambda records: scorer.raw_scores(records), BATCH_WINDOW_MS, BATCH_MAX_ROWS)
+        return batcher
+
+def score_through_batcher(records):
+    return [batcher.submit(record, timeout=BATCH_TIMEOUT_S) for record in records]
+
+profiler = SlowRequestProfiler(PROFILE_SLOW_MS, PROFILE_DIR, PROFILE_INTERVAL_MS) if PROFILE_SLOW_MS > 0 else None
+
+# Route template of the current request; unmatched paths share one label value
+def endpoint_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+# Request counters, latency and the optional profiler wrap every request
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if profiler is not None:
+        g.profile_token = profiler.start()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = endpoint_label()
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    if response.status_code >= 500:
+        ERRORS.inc(endpoint=endpoint, kind='server_error')
+    if profiler is not None:
+        profiler.stop(g.profile_token, f"{request.method} {endpoint}")
+    return response
+
+# Format one scoring result for the JSON responses; adverse decisions carry their reason codes
+def format_result(result):
+    formatted = {
+        'loan_eligibility': 'Not Eligible' if result['prediction'] == ADVERSE_CLASS else 'Eligible',
+        'loan_status_probability': result['probability'],
+        'risk_band': result['risk_band']
+    }
+    if result['prediction'] == ADVERSE_CLASS:
+        formatted['reason_codes'] = result['reasons']
+    return formatted
+
+# Parse a batch request body into a list of applicant records, plus {row: error} for
+# newline-delimited JSON lines that aren't valid JSON (the other rows are still scored)
+def parse_batch_body(req):
+    content_type = (req.mimetype or '').lower()
+    body = req.get_data(as_text=True)
 
-# Function to make predictions
-def predict_loan_eligibility(input_data):
-    prediction = model.predict(input_data)
-    return prediction
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/ndjson'):
+        records, errors = [], {}
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                errors[len(records)] = f"invalid JSON: {e}"
+                records.append(None)
+        return records, errors
+
+    if content_type in ('text/csv', 'application/csv'):
+        frame = pd.read_csv(io.StringIO(body), dtype={name: str for name in categorical_features})
+        frame = frame.astype(object).where(frame.notna(), None)
+        return frame.to_dict(orient='records'), {}
+
+    records = json.loads(body)
+    if isinstance(records, dict) and 'applicants' in records:
+        records = records['applicants']
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array of applicants")
+    return records, {}
+
+# Validate one applicant record. Returns (applicant, problems): the applicant holds just the
+# model fields, with numeric values already converted to finite floats, so the scorer never
+# has to parse (and fail on) client input; problems is empty if the record is valid.
+def validate_record(record):
+    if not isinstance(record, dict):
+        return None, ["applicant must be a JSON object"]
+
+    # Every model field must be present; a null value is imputed, a missing key is
+    # more likely a misspelt or wrong column and would otherwise be scored on means
+    fields = numeric_features + categorical_features
+    missing = [name for name in fields if name not in record]
+    if missing:
+        errors = [f"missing fields: {', '.join(missing)}"]
+        unknown = [str(name) for name in record if name not in fields]
+        if unknown:
+            errors.append(f"unknown fields: {', '.join(unknown)}")
+        return None, errors
+
+    applicant, errors = {}, []
+    for name in numeric_features:
+        value = record[name]
+        if value is None:
+            applicant[name] = None  # null numeric values are imputed by the model pipeline
+            continue
+        try:
+            number = float(value) if not isinstance(value, bool) else math.nan
+        except (TypeError, ValueError, OverflowError):
+            number = math.nan
+        if not math.isfinite(number):  # also rejects "nan", "inf" and overflowing values such as 1e400
+            errors.append(f"{name} must be a finite number")
+        applicant[name] = number
+    for name in categorical_features:
+        value = record[name]
+        if value is not None and not isinstance(value, str):
+            errors.append(f"{name} must be a string")
+        applicant[name] = value
+    return applicant, errors
 
 # Define the API endpoint
 @app.route('/predict', methods=['POST'])
 def predict():
     # Get data from the POST request
-    data = request.get_json()
+    with scorer.timed('parse'):
+        data = request.get_json()
+    product = request.args.get('product', 'default')
 
-    # Convert the input data into a pandas DataFrame
-    input_data = pd.DataFrame([data])
+    # Reject malformed applicants here so they can't fail a whole micro-batch
+    with scorer.timed('validate'):
+        applicant, errors = validate_record(data)
+    if errors:
+        ERRORS.inc(endpoint='/predict', kind='invalid_applicant')
+        return jsonify({'error': '; '.join(errors)}), 400
 
-    # Get the prediction
-    prediction = predict_loan_eligibility(input_data)
+    # Get the prediction, scored together with any concurrent requests when batching is on
+    try:
+        result = scorer.score_records([applicant], product, score_through_batcher if get_batcher() is not None else None)[0]
+    except UnknownProductError as e:
+        ERRORS.inc(endpoint='/predict', kind='unknown_product')
+        return jsonify({'error': str(e)}), 400
+    except FutureTimeoutError:
+        ERRORS.inc(endpoint='/predict', kind='batch_timeout')
+        return jsonify({'error': f"No prediction within {BATCH_TIMEOUT_S:g} s"}), 503
 
     # Return the prediction as JSON response
-    result = {
-        'loan_eligibility': 'Eligible' if prediction[0] == 1 else 'Not Eligible'
+    with scorer.timed('serialize'):
+        return jsonify(format_result(result))
+
+# Define the batch API endpoint (JSON array, newline-delimited JSON or CSV body)
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    product = request.args.get('product', 'default')
+    try:
+        scorer.threshold(product)
+    except UnknownProductError as e:
+        ERRORS.inc(endpoint='/predict/batch', kind='unknown_product')
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        with scorer.timed('parse'):
+            records, parse_errors = parse_batch_body(request)
+    except (ValueError, pd.errors.ParserError) as e:
+        ERRORS.inc(endpoint='/predict/batch', kind='invalid_body')
+        return jsonify({'error': f"Invalid batch body: {str(e)}"}), 400
+
+    if len(records) > MAX_BATCH_SIZE:
+        ERRORS.inc(endpoint='/predict/batch', kind='batch_too_large')
+        return jsonify({'error': f"Batch of {len(records)} applicants exceeds the limit of {MAX_BATCH_SIZE}"}), 413
+
+    # Validate every row up front so one bad applicant doesn't fail the whole batch
+    results = [None] * len(records)
+    valid_rows, applicants = [], []
+    with scorer.timed('validate'):
+        for row, record in enumerate(records):
+            applicant, errors = (None, [parse_errors[row]]) if row in parse_errors else validate_record(record)
+            if errors:
+                results[row] = {'row': row, 'error': '; '.join(errors)}
+            else:
+                valid_rows.append(row)
+                applicants.append(applicant)
+    if len(valid_rows) < len(records):
+        ERRORS.inc(len(records) - len(valid_rows), endpoint='/predict/batch', kind='invalid_applicant')
+
+    # Score all valid, uncached applicants in a single DataFrame / single model pass
+    if valid_rows:
+        scored = scorer.score_records(applicants, product)
+        for row, result in zip(valid_rows, scored):
+            results[row] = dict(format_result(result), row=row)
+
+    with scorer.timed('serialize'):
+        return jsonify({
+            'results': results,
+            'scored': len(valid_rows),
+            'failed': len(records) - len(valid_rows)
+        })
+
+# Report the batch sizes achieved by the micro-batcher
+@app.route('/metrics/batching', methods=['GET'])
+def batching_metrics():
+    active = get_batcher()
+    if active is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(active.stats(), enabled=True))
+
+# Report prediction cache hit/miss and eviction counters
+@app.route('/metrics/cache', methods=['GET'])
+def cache_metrics():
+    return jsonify(scorer.cache.stats())
+
+# Prediction cache and micro-batcher counters, read from their stats() at scrape time
+def collect_component_stats():
+    cache = scorer.cache.stats()
+    families = [
+        ('loan_prediction_cache_events_total', 'counter', "Prediction cache lookups and removals by outcome.",
+         [({'event': event}, cache[event]) for event in ('hits', 'misses', 'evictions', 'expirations', 'invalidations')]),
+        ('loan_prediction_cache_entries', 'gauge', "Entries in the prediction cache.", [({}, cache['size'])]),
+    ]
+    if batcher is not None:
+        batching = batcher.stats()
+        families += [
+            ('loan_microbatch_batches_total', 'counter', "Micro-batches scored.", [({}, batching['batches'])]),
+            ('loan_microbatch_rows_total', 'counter', "Requests scored through the micro-batcher.",
+             [({}, batching['rows'])]),
+            ('loan_microbatch_queue_wait_seconds_mean', 'gauge', "Mean time requests waited for their micro-batch.",
+             [({}, batching['mean_queue_wait_ms'] / 1000.0)]),
+            ('loan_microbatch_pending', 'gauge', "Requests waiting for a micro-batch.", [({}, batching['pending'])]),
+        ]
+    return families
+
+REGISTRY.add_collector(collect_component_stats)
+
+# Prometheus scrape endpoint: stage latencies, request/row/error counters, batch sizes, model version
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+# Liveness: the process is up and answering HTTP
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({'status': 'ok'})
+
+# Readiness: the model is loaded and warmed up, and this process can score requests
+# (its micro-batcher thread, once started, is running)
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    ready = batcher is None or batcher.running
+    status = {
+        'status': 'ready' if ready else 'not ready',
+        'model_path': scorer.model_path,
+        'compiled': scorer.compiled,
+        'model_version': scorer.model_version,
+        'model_loaded_at': scorer.loaded_at,
+        'pid': os.getpid()
     }
-    return jsonify(result)
+    return jsonify(status), 200 if ready else 503
 
-# Run the Flask app
+# Run the Flask app (development server; use serve.py in production)
 if __name__ == '__main__':
     app.run(debug=True)
@@ -1,15 +1,17 @@
 import streamlit as st
-import pandas as pd
-import pickle
 
-# Load the trained model
-with open('loan_model.pkl', 'rb') as model_file:
-    model = pickle.load(model_file)
+from scoring import ADVERSE_CLASS, Scorer
 
-# Function to make predictions
-def predict_loan_eligibility(input_data):
-    prediction = model.predict(input_data)
-    return prediction
+# Load the trained model once per server (its prediction cache survives reruns and UI refreshes)
+@st.cache_resource
+def get_scorer():
+    return Scorer()
+
+scorer = get_scorer()
+
+# Function to make predictions: class, calibrated probability and risk band in one model call
+def predict_loan_eligibility(applicant, product='default'):
+    return scorer.score_records([applicant], product)[0]
 
 # Streamlit app layout
 st.title("Loan Eligibility Prediction")
@@ -26,27 +28,30 @@ loan_int_rate = st.number_input("Loan Interest Rate", min_value=0.0, max_value=1
 loan_percent_income = st.number_input("Loan Percent of Income", min_value=0.0, max_value=100.0, value=10.0)
 default_on_file = st.selectbox("Default on File (Yes/No)", options=['Y', 'N'])
 cred_hist_length = st.number_input("Credit History Length (years)", min_value=0, value=3)
+product = st.selectbox("Loan Product", options=sorted(scorer.thresholds))
 
-# Create a DataFrame with the input values
-input_data = pd.DataFrame({
-    'person_age': [age],
-    'person_income': [income],
-    'person_home_ownership': [home_ownership],
-    'person_emp_length': [emp_length],
-    'loan_intent': [loan_intent],
-    'loan_grade': [loan_grade],
-    'loan_amnt': [loan_amnt],
-    'loan_int_rate': [loan_int_rate],
-    'loan_percent_income': [loan_percent_income],
-    'cb_person_default_on_file': [default_on_file],
-    'cb_person_cred_hist_length': [cred_hist_length]
-})
+# Collect the input values for the model
+applicant = {
+    'person_age': age,
+    'person_income': income,
+    'person_home_ownership': home_ownership,
+    'person_emp_length': emp_length,
+    'loan_intent': loan_intent,
+    'loan_grade': loan_grade,
+    'loan_amnt': loan_amnt,
+    'loan_int_rate': loan_int_rate,
+    'loan_percent_income': loan_percent_income,
+    'cb_person_default_on_file': default_on_file,
+    'cb_person_cred_hist_length': cred_hist_length
+}
 
 # Button to trigger prediction
 if st.button("Predict Loan Eligibility"):
-    prediction = predict_loan_eligibility(input_data)
+    result = predict_loan_eligibility(applicant, product)
     
-    if prediction[0] == 1:
+    if result['prediction'] != ADVERSE_CLASS:
         st.success("You are eligible for the loan!")
     else:
         st.error("You are not eligible for the loan.")
+        st.write("Main factors: " + ', '.join(reason['field'] for reason in result['reasons']))
+    st.write(f"Default probability: {result['probability']:.1%} (risk band: {result['risk_band']})")
@@ -0,0 +1,110 @@
+import threading
+import queue
+import time
+from concurrent.futures import Future
+
+# Upper bounds of the batch-size histogram buckets reported by MicroBatcher.stats()
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row requests into one batched model call.
+
+    Callers block in submit() while a background worker collects requests for
+    up to max_wait_ms (or until max_batch_rows are queued), scores them together
+    with score_batch(records) -> list of results, and hands each caller its row.
+    If scoring a batch fails, its records are retried one at a time, so an error
+    only reaches the caller whose record caused it. submit() raises
+    concurrent.futures.TimeoutError if no result arrives in time.
+    """
+
+    def __init__(self, score_batch, max_wait_ms=2.0, max_batch_rows=64):
+        self.score_batch = score_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._max_batch = 0
+        self._queue_wait = 0.0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    @property
+    def running(self):
+        # False in a process forked after the batcher was created: threads don't survive fork
+        return self._worker.is_alive()
+
+    def submit(self, record, timeout=None):
+        future = Future()
+        self._queue.put((record, future, time.perf_counter()))
+        return future.result(timeout=timeout)
+
+    def _collect(self):
+        # Block for the first request, then keep the window open for the rest
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            records = [record for record, _, _ in batch]
+            try:
+                self._resolve(batch, self.score_batch(records))
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    # Score the records one by one, so a bad record only fails its own caller
+                    for item in batch:
+                        try:
+                            self._resolve([item], self.score_batch([item[0]]))
+                        except Exception as single_error:
+                            item[1].set_exception(single_error)
+            self._record(len(batch), sum(started - enqueued for _, _, enqueued in batch))
+
+    def _resolve(self, batch, results):
+        results = list(results)
+        for i, (_, future, _) in enumerate(batch):
+            if i < len(results):
+                future.set_result(results[i])
+            else:
+                # A short result list must not leave callers waiting forever
+                future.set_exception(RuntimeError(
+                    f"score_batch returned {len(results)} results for {len(batch)} records"))
+
+    def _record(self, size, queue_wait):
+        bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound), len(BATCH_SIZE_BUCKETS))
+        with self._lock:
+            self._batches += 1
+            self._rows += size
+            self._max_batch = max(self._max_batch, size)
+            self._queue_wait += queue_wait
+            self._histogram[bucket] += 1
+
+    def stats(self):
+        with self._lock:
+            labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+            return {
+                'max_wait_ms': self.max_wait * 1000.0,
+                'max_batch_rows': self.max_batch_rows,
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'max_batch_size': self._max_batch,
+                'mean_queue_wait_ms': 1000.0 * self._queue_wait / self._rows if self._rows else 0.0,
+                'batch_size_histogram': dict(zip(labels, self._histogram)),
+                'pending': self._queue.qsize()
+            }
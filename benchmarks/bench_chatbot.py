@@ -0,0 +1,57 @@
+"""Per-turn cost of the chatbot as a session grows, measured headless with AppTest.
+
+Completes one intake, then keeps asking free-form questions (answered by the
+local LLM stand-in) and reports the script run time per turn at several points
+in the session. With incremental rendering the late turns should cost the same
+as the early ones.
+
+    python -m benchmarks.bench_chatbot --turns 300
+"""
+import argparse
+import os
+import time
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.llm_standin import start_standin
+
+INTAKE = ["30", "52000", "RENT", "5", "PERSONAL", "B", "10000", "11.5", "N", "6"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='ai_chatbot.py')
+    parser.add_argument('--turns', type=int, default=300)
+    parser.add_argument('--window', type=int, default=25, help="turns averaged per report line")
+    args = parser.parse_args()
+
+    server, base_url = start_standin(first_token_ms=0, token_ms=0)
+    os.environ['LLM_BASE_URL'] = base_url
+    app = AppTest.from_file(os.path.abspath(args.app), default_timeout=60).run()
+
+    started = time.perf_counter()
+    for answer in INTAKE:
+        app.chat_input[0].set_value(answer).run()
+    print(f"Intake of {len(INTAKE)} single-field turns: {time.perf_counter() - started:.2f}s", flush=True)
+
+    app = AppTest.from_file(os.path.abspath(args.app), default_timeout=60).run()
+    started = time.perf_counter()
+    app.chat_input[0].set_value("age 30, income $52,000, I rent, employed 5 years, personal loan, grade B").run()
+    app.chat_input[0].set_value("loan amount 10000 at 11.5% interest, no defaults, 6 years of credit history").run()
+    print(f"Intake in two multi-field turns: {time.perf_counter() - started:.2f}s "
+          f"(prediction made: {app.session_state.prediction_made})", flush=True)
+
+    timings = []
+    for turn in range(args.turns):
+        started = time.perf_counter()
+        app.chat_input[0].set_value(f"Question {turn}: how is APR computed?").run()
+        timings.append(1000.0 * (time.perf_counter() - started))
+    for start in range(0, args.turns, args.window):
+        window = timings[start:start + args.window]
+        print(f"turns {start:4d}-{start + len(window) - 1:4d} ({2 * start + 3:5d}+ messages): "
+              f"mean {np.mean(window):7.1f} ms/turn", flush=True)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Load time and peak RSS: CSV with pandas defaults vs the columnar format.
+
+Each measurement runs in a fresh process; peak RSS is read from /proc, so Linux only.
+
+    python -m benchmarks.bench_columnar --sizes 32581 1000000 4000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_streaming_train import write_scaled_dataset
+from columnar import convert_csv
+
+# Each loader touches every value so lazily mapped pages are actually read
+LOADERS = {
+    'csv': "import pandas as pd; df = pd.read_csv(PATH); df.memory_usage(deep=True).sum()",
+    'columnar (mmap)': "from columnar import load_columnar; d = load_columnar(PATH); "
+                       "[column.sum() for column in d.columns.values()]",
+    'columnar -> DataFrame': "from columnar import load_columnar; df = load_columnar(PATH).to_frame(); "
+                             "df.memory_usage(deep=True).sum()",
+}
+
+MEASURE = """
+import time
+import numpy, pandas, columnar
+
+def rss_mib(field):
+    with open('/proc/self/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith(field)) / 1024.0
+
+# Reset the peak-RSS high-water mark (Linux) so imports and the parent process don't count
+with open('/proc/self/clear_refs', 'w') as clear_refs:
+    clear_refs.write('5')
+before = rss_mib('VmRSS:')
+started = time.perf_counter()
+{loader}
+print(time.perf_counter() - started, rss_mib('VmHWM:') - before)
+"""
+
+
+def measure(loader, path):
+    """Return (load seconds, peak RSS growth in MiB) for one loader in a child process.
+
+    Library imports are excluded from both numbers.
+    """
+    code = MEASURE.format(loader=loader.replace('PATH', repr(path)))
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    seconds, peak = output.split()
+    return float(seconds), float(peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='credit_risk_dataset.csv')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[32581, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'loader':<22} {'seconds':>9} {'peak RSS growth MiB':>20}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            csv_path = os.path.join(workdir, f'credit_{size}.csv')
+            columnar_path = os.path.join(workdir, f'credit_{size}.cols')
+            write_scaled_dataset(args.data, csv_path, size)
+            convert_csv(csv_path, columnar_path)
+            for name, loader in LOADERS.items():
+                path = csv_path if name == 'csv' else columnar_path
+                seconds, peak = measure(loader, path)
+                print(f"{size:>10} {name:<22} {seconds:>9.3f} {peak:>20.0f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Parity check and latency benchmark: pickled pipeline vs compiled fast-inference model.
+
+Run from the repository root after training:
+    python -m benchmarks.bench_fast_inference
+"""
+import argparse
+import pickle
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from fast_inference import CompiledModel
+from train_model import target
+
+
+def time_per_call(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return np.percentile(timings, [50, 99]) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='credit_risk_dataset.csv')
+    parser.add_argument('--model', default='loan_model.pkl')
+    parser.add_argument('--compiled', default='loan_model_fast')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as model_file:
+        pipeline = pickle.load(model_file)
+    compiled = CompiledModel.load(args.compiled)
+
+    df = pd.read_csv(args.data).drop(columns=target)
+    records = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+    # Parity over the whole dataset
+    expected = pipeline.predict_proba(df)
+    actual = compiled.predict_proba(compiled.encode(records))
+    max_diff = float(np.abs(expected - actual).max())
+    mismatches = int((pipeline.classes_[expected.argmax(axis=1)] != compiled.classes_[actual.argmax(axis=1)]).sum())
+    print(f"Parity over {len(df)} rows: max |proba diff| = {max_diff:.3g}, class mismatches = {mismatches}")
+
+    # Single-row latency
+    record = records[0]
+    frame = pd.DataFrame([record])
+    pickle_p50, pickle_p99 = time_per_call(lambda: pipeline.predict_proba(frame), args.repeat)
+    dict_p50, dict_p99 = time_per_call(lambda: pipeline.predict_proba(pd.DataFrame([record])), args.repeat)
+    fast_p50, fast_p99 = time_per_call(lambda: compiled.predict_proba_dict(record), args.repeat)
+    print("Single-row latency (ms)          p50       p99")
+    print(f"  pickle, prebuilt DataFrame  {pickle_p50:8.3f}  {pickle_p99:8.3f}")
+    print(f"  pickle, dict -> DataFrame   {dict_p50:8.3f}  {dict_p99:8.3f}")
+    print(f"  compiled, dict              {fast_p50:8.3f}  {fast_p99:8.3f}")
+
+    # Batch throughput
+    print("Batch throughput (rows/sec)    pickle   compiled")
+    X = compiled.encode(records)
+    for size in (64, 1024, len(df)):
+        started = time.perf_counter()
+        pipeline.predict_proba(df.iloc[:size])
+        pickle_rate = size / (time.perf_counter() - started)
+        started = time.perf_counter()
+        compiled.predict_proba(X[:size])
+        fast_rate = size / (time.perf_counter() - started)
+        print(f"  {size:>8} rows           {pickle_rate:10.0f} {fast_rate:10.0f}")
+
+    if max_diff > 1e-9 or mismatches:
+        sys.exit("Compiled model does not match the pickled pipeline")
+
+
+if __name__ == '__main__':
+    main()
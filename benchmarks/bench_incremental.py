@@ -0,0 +1,94 @@
+"""Cost of a full retrain vs an incremental update (incremental.py) as the book grows.
+
+For each book size a synthetic scale-up of credit_risk_dataset.csv is trained
+from scratch with train_model.py, then updated with a batch of new loans drawn
+from the same distribution (so no drift triggers a full retrain). Both run in
+their own process; the report gives wall-clock seconds, CPU seconds and peak RSS.
+After each full train it also checks the threshold remap: rows with a numeric
+field on a split's cut point must reach the same leaf in every tree before and
+after the statistics are merged with the new loans.
+
+    python -m benchmarks.bench_incremental --sizes 50000 200000 800000 --new-rows 5000
+"""
+import argparse
+import copy
+import os
+import pickle
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_streaming_train import run_child, scale_up, write_scaled_dataset
+from incremental import BookState, on_cut_values, remap_thresholds, state_path
+from streaming_train import install_statistics
+from train_model import numeric_features, target
+
+
+def threshold_parity(model_path, new_data):
+    """(on-cut rows reaching another leaf in some tree after the remap, on-cut rows checked)."""
+    with open(model_path, 'rb') as model_file:
+        before = pickle.load(model_file)
+    after = copy.deepcopy(before)
+    stats = BookState.load(state_path(model_path)).stats
+    new = pd.read_csv(new_data)
+    stats.update(new)
+    preprocessor = after.named_steps['preprocessor']
+    scaler = preprocessor.named_transformers_['num'].named_steps['scaler']
+    old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+    install_statistics(preprocessor, stats)
+    remap_thresholds(after.named_steps['classifier'], old_mean, old_scale, scaler.mean_, scaler.scale_)
+
+    # One row per (split, on-cut value): a new loan with that split's field set on the cut
+    features, values = [], []
+    for estimator in before.named_steps['classifier'].estimators_:
+        tree = estimator.tree_
+        split = (tree.feature >= 0) & (tree.feature < len(old_mean))
+        on_cut, tie = on_cut_values(tree.threshold[split], tree.feature[split], old_mean, old_scale)
+        features.append(tree.feature[split][tie])
+        values.append(on_cut[tie])
+    features, values = np.concatenate(features), np.concatenate(values)
+    rows = new.drop(columns=target).iloc[np.zeros(len(values), dtype=int)].reset_index(drop=True)
+    rows[numeric_features] = rows[numeric_features].astype(np.float64)
+    for j, name in enumerate(numeric_features):
+        rows.loc[features == j, name] = values[features == j]
+
+    leaves = [pipeline.named_steps['classifier'].apply(pipeline.named_steps['preprocessor'].transform(rows))
+              for pipeline in (before, after)]
+    return int(np.any(leaves[0] != leaves[1], axis=1).sum()), len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='credit_risk_dataset.csv')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50000, 200000, 800000])
+    parser.add_argument('--new-rows', type=int, default=5000, help="labelled loans per incremental update")
+    parser.add_argument('--refresh-trees', type=int, default=10)
+    parser.add_argument('--sample-size', type=int, default=50000, help="forest sample in --stream mode and updates")
+    parser.add_argument('--stream', action='store_true', help="train the full model in --stream mode")
+    args = parser.parse_args()
+
+    print(f"{'book rows':>10} {'mode':<12} {'seconds':>9} {'CPU s':>8} {'peak RSS MiB':>13}")
+    with tempfile.TemporaryDirectory() as workdir:
+        model = os.path.join(workdir, 'model.pkl')
+        new = os.path.join(workdir, 'new.csv')
+        scale_up(pd.read_csv(args.data), args.new_rows, np.random.default_rng(1)).to_csv(new, index=False)
+        for size in args.sizes:
+            book = os.path.join(workdir, f'book_{size}.csv')
+            write_scaled_dataset(args.data, book, size)
+            full = [sys.executable, 'train_model.py', '--data', book, '--output', model,
+                    '--compiled-output', os.path.join(workdir, 'model_fast'), '--sample-size', str(args.sample_size)]
+            update = [sys.executable, 'incremental.py', '--new', new, '--model', model,
+                      '--compiled-output', os.path.join(workdir, 'model_fast'),
+                      '--refresh-trees', str(args.refresh_trees)]
+            for mode, command in [('full', full + (['--stream'] if args.stream else [])), ('incremental', update)]:
+                if mode == 'incremental':
+                    changed, checked = threshold_parity(model, new)
+                    print(f"{size:>10} on-cut rows reaching another leaf after the remap: {changed} of {checked}")
+                seconds, cpu, peak = run_child(command)
+                print(f"{size:>10} {mode:<12} {seconds:>9.1f} {cpu:>8.1f} {peak:>13.0f}", flush=True)
+            os.remove(book)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Time-to-first-token and duplicate-question cost of the LLM gateway, offline.
+
+Runs against the local stand-in server (benchmarks/llm_standin.py) and compares
+the old blocking completion call with gateway streaming and cached answers.
+
+    python -m benchmarks.bench_llm_gateway --first-token-ms 300 --token-ms 20
+"""
+import argparse
+import time
+import numpy as np
+from groq import Groq
+
+from benchmarks.llm_standin import start_standin
+from llm_gateway import AnswerCache, GroqBackend, LLMGateway
+
+MODEL = 'llama3-groq-70b-8192-tool-use-preview'
+SYSTEM = {"role": "system", "content": "You are a loan expert assistant."}
+QUESTIONS = ["What is a debt-to-income ratio?", "How does APR differ from interest rate?",
+             "what is a debt to income ratio", "Can I refinance a personal loan?"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--token-ms', type=float, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    server, base_url = start_standin(first_token_ms=args.first_token_ms, token_ms=args.token_ms)
+    client = Groq(api_key='standin', base_url=base_url)
+
+    # Baseline: blocking call, the user sees nothing until the whole answer arrives
+    blocking = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        client.chat.completions.create(model=MODEL, messages=[SYSTEM, {"role": "user", "content": QUESTIONS[0]}],
+                                       max_tokens=500)
+        blocking.append(1000.0 * (time.perf_counter() - started))
+
+    # Gateway: streaming with a pooled client; no cache so every call goes upstream
+    uncached = LLMGateway(GroqBackend(client, MODEL), cache=AnswerCache(maxsize=0))
+    for _ in range(args.repeat):
+        uncached.complete([SYSTEM, {"role": "user", "content": QUESTIONS[0]}])
+
+    # Gateway with the answer cache: FAQ traffic with duplicates
+    server.requests = 0
+    gateway = LLMGateway(GroqBackend(client, MODEL))
+    for _ in range(args.repeat):
+        for question in QUESTIONS:
+            gateway.complete([SYSTEM, {"role": "user", "content": question}])
+
+    streaming = uncached.stats()['ttft_ms']
+    cached = gateway.stats()
+    print(f"Blocking call, time to first visible text: p50 {np.median(blocking):8.1f} ms")
+    print(f"Gateway streaming, time to first token:    p50 {streaming['p50']:8.1f} ms")
+    print(f"Gateway cache hit, full answer:            p50 {cached['cache_hit_ms']['p50']:8.3f} ms")
+    print(f"Duplicate questions: {cached['requests']} asked, {server.requests} upstream calls "
+          f"(hit rate {cached['cache_hit_rate']:.0%})")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Cost of reason codes: explained forest pass vs the plain predict path.
+
+Checks that the precomputed Saabas tables in the model artifact add up (bias +
+contributions == P(loan_status=1)) and agree with contributions computed per
+request by walking scikit-learn's decision paths. Then it times, per batch size,
+the pickled pipeline's predict_proba, the compiled model's plain pass and its
+explained pass (probabilities and per-field contributions from one traversal),
+plus the per-request decision-path computation the tables replace.
+
+    python -m benchmarks.bench_reason_codes --sizes 1 16 256 4096
+"""
+import argparse
+import pickle
+import time
+import numpy as np
+import pandas as pd
+
+from fast_inference import CompiledModel
+from train_model import numeric_features, categorical_features
+
+
+def time_per_call(fn, repeat):
+    fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1000.0
+
+
+def decision_path_contributions(pipeline, frame, field_of_output):
+    """Saabas contributions computed at request time from every tree's decision path."""
+    preprocessor, forest = pipeline.named_steps['preprocessor'], pipeline.named_steps['classifier']
+    Xt = preprocessor.transform(frame).astype(np.float32)
+    positive = list(forest.classes_).index(1)
+    contributions = np.zeros((len(frame), len(numeric_features) + len(categorical_features)))
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        probability = tree.value[:, 0, positive] / tree.value[:, 0, :].sum(axis=1)
+        paths = estimator.decision_path(Xt)
+        for i in range(len(frame)):
+            nodes = paths.indices[paths.indptr[i]:paths.indptr[i + 1]]
+            np.add.at(contributions[i], field_of_output[tree.feature[nodes[:-1]]], np.diff(probability[nodes]))
+    return contributions / len(forest.estimators_)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='credit_risk_dataset.csv')
+    parser.add_argument('--model', default='loan_model.pkl')
+    parser.add_argument('--compiled', default='loan_model_fast')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 16, 256, 4096])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as model_file:
+        pipeline = pickle.load(model_file)
+    compiled = CompiledModel.load(args.compiled, mmap_mode='r')
+    frame = pd.read_csv(args.data)[numeric_features + categorical_features]
+    Xt = compiled.transform(compiled.encode_frame(frame))
+
+    proba, contributions = compiled.explain_transformed(Xt)
+    additivity = float(np.abs(compiled.bias + contributions.sum(axis=1) - proba[:, 1]).max())
+    field_of_output = np.concatenate([np.arange(len(numeric_features))] +
+                                     [np.full(len(cats), len(numeric_features) + j)
+                                      for j, cats in enumerate(compiled.meta['categories'])])
+    reference = decision_path_contributions(pipeline, frame.iloc[:200], field_of_output)
+    agreement = float(np.abs(reference - contributions[:200]).max())
+    print(f"Over {len(frame)} rows: max |bias + contributions - P(loan_status=1)| = {additivity:.3g}; "
+          f"max |table - decision-path contributions| (200 rows) = {agreement:.3g}")
+
+    print(f"{'rows':>6} {'pickle ms':>10} {'plain ms':>9} {'explained ms':>13} {'overhead':>9} {'decision path ms':>17}")
+    for size in args.sizes:
+        rows = frame.iloc[:size]
+        block = Xt[:size]
+        pickle_ms = time_per_call(lambda: pipeline.predict_proba(rows), args.repeat)
+        plain_ms = time_per_call(lambda: compiled.predict_proba_transformed(block), args.repeat)
+        explained_ms = time_per_call(lambda: compiled.explain_transformed(block), args.repeat)
+        path_ms = time_per_call(lambda: decision_path_contributions(pipeline, rows, field_of_output),
+                                max(1, args.repeat // 10)) if size <= 256 else float('nan')
+        print(f"{size:>6} {pickle_ms:>10.3f} {plain_ms:>9.3f} {explained_ms:>13.3f} "
+              f"{explained_ms / plain_ms - 1.0:>+9.0%} {path_ms:>17.3f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Throughput of the bulk scoring CLI (rows/sec) against worker count.
+
+    python -m benchmarks.bench_score --rows 1000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_streaming_train import write_scaled_dataset
+from score import score_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='credit_risk_dataset.csv')
+    parser.add_argument('--model', default='loan_model_fast')
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--chunksize', type=int, default=50000)
+    default_workers = sorted({1, 2, 4, os.cpu_count()} & set(range(1, os.cpu_count() + 1)))
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        input_path = os.path.join(workdir, 'portfolio.csv')
+        output_path = os.path.join(workdir, 'scores.csv')
+        write_scaled_dataset(args.data, input_path, args.rows)
+
+        print(f"{'workers':>7} {'seconds':>9} {'rows/sec':>10}")
+        for workers in args.workers:
+            started = time.perf_counter()
+            rows = score_file(input_path, output_path, args.model, workers, args.chunksize)
+            elapsed = time.perf_counter() - started
+            print(f"{workers:>7} {elapsed:>9.1f} {rows / elapsed:>10.0f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
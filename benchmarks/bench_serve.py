@@ -0,0 +1,126 @@
+"""Load test of the production server (serve.py) at several worker counts.
+
+For each worker count a local server is started, warmed up, and driven by
+concurrent keep-alive clients (one process each) posting applicants from the
+dataset to /predict for a fixed time. The report gives requests/sec,
+p50/p95/p99 latency and the server's memory. Total RSS counts shared pages once
+per process; PSS splits them between the processes, so it shows what
+preloading (or memory-mapping) the model saves.
+
+    python -m benchmarks.bench_serve --workers 1 2 4 --threads 4 --clients 16 --duration 10
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+
+from train_model import numeric_features, categorical_features
+
+
+def load_applicants(path, n=5000, seed=0):
+    frame = pd.read_csv(path, usecols=numeric_features + categorical_features).sample(n, random_state=seed)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [json.dumps(record).encode() for record in frame.to_dict(orient='records')]
+
+
+def wait_ready(port, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/readyz')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} not ready after {timeout}s")
+
+
+def run_client(args):
+    port, bodies, duration, offset = args
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Content-Type': 'application/json'}
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    i = offset
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        connection.request('POST', '/predict', bodies[i % len(bodies)], headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+        errors += response.status != 200
+        i += 1
+    connection.close()
+    return latencies, errors
+
+
+def process_tree(pid):
+    pids = [pid]
+    for child in open(f'/proc/{pid}/task/{pid}/children').read().split():
+        pids.extend(process_tree(int(child)))
+    return pids
+
+
+def memory_mb(pid):
+    """Total (RSS, PSS) in MB of a process and its descendants."""
+    rss = pss = 0
+    for process in process_tree(pid):
+        for line in open(f'/proc/{process}/smaps_rollup'):
+            if line.startswith('Rss:'):
+                rss += int(line.split()[1])
+            elif line.startswith('Pss:'):
+                pss += int(line.split()[1])
+    return rss / 1024, pss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='credit_risk_dataset.csv')
+    parser.add_argument('--model', default='loan_model.pkl', help="pickle or compiled model directory")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16, help="concurrent client connections")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help="server PREDICTION_CACHE_SIZE (0 measures the model, not the cache)")
+    parser.add_argument('--port', type=int, default=8099)
+    args = parser.parse_args()
+
+    bodies = load_applicants(args.data)
+    env = dict(os.environ, PREDICTION_CACHE_SIZE=str(args.cache_size))
+    print(f"{'workers':>7} {'threads':>7} {'req/sec':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>6} {'RSS MB':>8} {'PSS MB':>8}", flush=True)
+    for workers in args.workers:
+        server = subprocess.Popen([sys.executable, 'serve.py', '--workers', str(workers), '--threads', str(args.threads),
+                                   '--bind', f'127.0.0.1:{args.port}', '--model', args.model],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(args.port)
+            time.sleep(1)  # let every worker boot
+            with Pool(args.clients) as pool:
+                pool.map(run_client, [(args.port, bodies, 1.0, i * 97) for i in range(args.clients)])  # warm-up
+                started = time.perf_counter()
+                results = pool.map(run_client, [(args.port, bodies, args.duration, i * 97) for i in range(args.clients)])
+                elapsed = time.perf_counter() - started
+            rss, pss = memory_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        latencies = 1000.0 * np.concatenate([np.asarray(latency) for latency, _ in results])
+        errors = sum(error for _, error in results)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{workers:>7} {args.threads:>7} {len(latencies) / elapsed:>9.0f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} "
+              f"{errors:>6} {rss:>8.0f} {pss:>8.0f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
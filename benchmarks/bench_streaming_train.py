@@ -0,0 +1,84 @@
+"""Rows/sec and peak RSS of streaming training at several dataset sizes.
+
+Synthetic datasets are scale-ups of credit_risk_dataset.csv (rows resampled with a
+little numeric jitter). Each training run happens in its own process so its peak
+RSS can be measured in isolation.
+
+    python -m benchmarks.bench_streaming_train --sizes 100000 400000 1600000 --in-memory
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from train_model import numeric_features
+
+
+def scale_up(base, n_rows, rng):
+    """n_rows resampled from the base frame, with a little numeric jitter."""
+    jittered = [name for name in numeric_features if name != 'person_age']
+    frame = base.sample(n_rows, replace=True, random_state=rng.integers(2 ** 31)).reset_index(drop=True)
+    frame[jittered] = frame[jittered] * rng.normal(1.0, 0.01, (n_rows, len(jittered)))
+    return frame
+
+
+def write_scaled_dataset(source, path, n_rows, chunksize=100000, seed=0):
+    """Write n_rows resampled from source to path, one chunk at a time."""
+    base = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+    written = 0
+    while written < n_rows:
+        size = min(chunksize, n_rows - written)
+        scale_up(base, size, rng).to_csv(path, mode='a' if written else 'w', header=not written, index=False)
+        written += size
+
+
+def run_child(command):
+    """Run a command in a child process; return (seconds, CPU seconds, peak RSS in MiB)."""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"Failed: {' '.join(command)}")
+    return elapsed, usage.ru_utime + usage.ru_stime, usage.ru_maxrss / 1024.0  # ru_maxrss is in KiB on Linux
+
+
+def run_training(args, workdir):
+    """Run train_model.py in a child process; return (seconds, peak RSS in MiB)."""
+    seconds, _, peak = run_child([sys.executable, 'train_model.py',
+                                  '--output', os.path.join(workdir, 'model.pkl'),
+                                  '--compiled-output', os.path.join(workdir, 'model_fast')] + args)
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='credit_risk_dataset.csv')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 400000, 1600000])
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--sample-size', type=int, default=50000)
+    parser.add_argument('--in-memory', action='store_true', help="also run the in-memory training mode for comparison")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'rows':>10} {'seconds':>9} {'rows/sec':>10} {'peak RSS MiB':>13}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            path = os.path.join(workdir, f'credit_{size}.csv')
+            write_scaled_dataset(args.data, path, size)
+            modes = [('stream', ['--stream', '--data', path, '--chunksize', str(args.chunksize),
+                                 '--sample-size', str(args.sample_size)])]
+            if args.in_memory:
+                modes.append(('memory', ['--data', path]))
+            for mode, mode_args in modes:
+                seconds, peak = run_training(mode_args, workdir)
+                print(f"{mode:<10} {size:>10} {seconds:>9.1f} {size / seconds:>10.0f} {peak:>13.0f}", flush=True)
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
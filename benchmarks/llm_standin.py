@@ -0,0 +1,89 @@
+"""Local stand-in for the Groq chat completions API (no network, no API key).
+
+Serves POST /openai/v1/chat/completions in both streaming (SSE) and blocking form,
+with configurable time-to-first-token and per-token delay, so the LLM gateway can
+be exercised and benchmarked offline:
+
+    python -m benchmarks.llm_standin --port 8765 --first-token-ms 300 --token-ms 20
+    LLM_BASE_URL=http://127.0.0.1:8765 streamlit run ai_chatbot.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = ("A debt-to-income ratio compares your monthly debt payments with your gross monthly income. "
+          "Lenders typically prefer it below 36 percent, and a lower ratio usually means better loan terms.")
+
+
+def make_handler(first_token_ms, token_ms, answer=ANSWER):
+    tokens = [word + ' ' for word in answer.split()]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, so pooled clients can reuse connections
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            self.server.requests += 1
+            time.sleep(first_token_ms / 1000.0)
+            if body.get('stream'):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(token_ms / 1000.0)
+                    self._write_chunk(self._event({'content': token}, body, None))
+                self._write_chunk(self._event({}, body, 'stop'))
+                self._write_chunk(b'data: [DONE]\n\n')
+                self._write_chunk(b'')
+            else:
+                time.sleep(token_ms * (len(tokens) - 1) / 1000.0)
+                payload = json.dumps({
+                    'id': 'standin', 'object': 'chat.completion', 'created': int(time.time()),
+                    'model': body.get('model'),
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': ''.join(tokens)}}],
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        def _event(self, delta, body, finish_reason):
+            chunk = {'id': 'standin', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': body.get('model'),
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]}
+            return f"data: {json.dumps(chunk)}\n\n".encode()
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_standin(port=0, first_token_ms=300, token_ms=20):
+    """Start the stand-in server on a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(first_token_ms, token_ms))
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--token-ms', type=float, default=20)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.first_token_ms, args.token_ms))
+    server.requests = 0
+    print(f"LLM stand-in listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,258 @@
+"""Inference benchmark suite for every scoring entry point, compared against a baseline.
+
+Measures, on credit_risk_dataset.csv and synthetic scale-ups of it:
+
+  * single-row latency and batch throughput of api.predict_loan_eligibility,
+    ai_chatbot.predict_default_risk and the Flask /predict and /predict/batch
+    endpoints (through the test client);
+  * load time and memory footprint of loan_model.pkl (and of the compiled model),
+    each in a fresh process;
+  * training time and peak RSS of train_model.py.
+
+Results go to a JSON file together with machine metadata. With --baseline, every
+metric is compared with the stored run; the exit status is 1 if any metric got
+worse by more than --tolerance, so the suite can gate a deployment:
+
+    python -m benchmarks.suite --output bench_results.json --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --quick --update-baseline benchmarks/baseline.json
+
+The prediction cache is disabled (PREDICTION_CACHE_SIZE=0) so every call measures
+the model; the micro-batcher keeps its configured window, as in production.
+"""
+import os
+
+os.environ.setdefault('PREDICTION_CACHE_SIZE', '0')
+
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from importlib.metadata import version
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_streaming_train import run_training, scale_up, write_scaled_dataset
+from train_model import numeric_features, categorical_features
+
+# Direction of each unit: True if lower is better
+LOWER_IS_BETTER = {'ms': True, 's': True, 'MiB': True, 'rows/s': False}
+
+# Absolute changes below these are timer/allocator noise and never count as regressions
+NOISE_FLOOR = {'ms': 0.5, 's': 0.05, 'MiB': 5.0, 'rows/s': 0.0}
+
+LOAD_SNIPPET = """
+import json, os, pickle, sys, time
+import numpy, pandas, sklearn.ensemble, sklearn.pipeline
+from fast_inference import CompiledModel
+
+def rss_kib():
+    for line in open('/proc/self/status'):
+        if line.startswith('VmRSS:'):
+            return int(line.split()[1])
+
+path = sys.argv[1]
+before = rss_kib()
+started = time.perf_counter()
+if os.path.isdir(path):
+    model = CompiledModel.load(path, mmap_mode='r')
+else:
+    with open(path, 'rb') as model_file:
+        model = pickle.load(model_file)
+seconds = time.perf_counter() - started
+print(json.dumps({'seconds': seconds, 'rss_mib': (rss_kib() - before) / 1024.0}))
+"""
+
+
+def metric(value, unit):
+    return {'value': float(value), 'unit': unit}
+
+
+def latency(fn, inputs, repeat):
+    """p50/p95 milliseconds of fn(input) over repeat calls, cycling through inputs after a warm-up."""
+    for item in inputs[:5]:
+        fn(item)
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(inputs[i % len(inputs)])
+        timings.append(1000.0 * (time.perf_counter() - started))
+    p50, p95 = np.percentile(timings, [50, 95])
+    return {'single_row_p50': metric(p50, 'ms'), 'single_row_p95': metric(p95, 'ms')}
+
+
+def throughput(fn, batch, repeat=3):
+    """Best-of-repeat rows/sec of fn(batch)."""
+    fn(batch)
+    best = min(timed(fn, batch) for _ in range(repeat))
+    return len(batch) / best
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def machine_metadata():
+    cpu = platform.processor()
+    try:
+        cpu = next(line.split(':', 1)[1].strip() for line in open('/proc/cpuinfo') if line.startswith('model name'))
+    except (OSError, StopIteration):
+        pass
+    try:
+        memory_gib = next(int(line.split()[1]) for line in open('/proc/meminfo') if line.startswith('MemTotal')) / 2 ** 20
+    except (OSError, StopIteration):
+        memory_gib = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'cpu': cpu,
+        'cpu_count': os.cpu_count(),
+        'memory_gib': memory_gib,
+        'python': platform.python_version(),
+        'packages': {name: version(name) for name in ('numpy', 'pandas', 'scikit-learn', 'flask')},
+        'git_commit': commit,
+    }
+
+
+def bench_model_load(model_paths):
+    results = {}
+    for path in model_paths:
+        output = subprocess.run([sys.executable, '-c', LOAD_SNIPPET, path], capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONPATH=os.getcwd()), check=True).stdout
+        measured = json.loads(output.strip().splitlines()[-1])
+        results[path] = {'load_time': metric(measured['seconds'], 's'), 'memory': metric(measured['rss_mib'], 'MiB')}
+    return results
+
+
+def bench_entry_points(frame, records, batch_frame, batch_records, repeat):
+    import api
+    import ai_chatbot
+    logging.getLogger('streamlit').setLevel(logging.ERROR)  # no script run context outside `streamlit run`
+
+    rows = [frame.iloc[[i]] for i in range(min(len(frame), 1000))]
+    client = api.app.test_client()
+    results = {}
+
+    results['api.predict_loan_eligibility'] = dict(
+        latency(api.predict_loan_eligibility, rows, repeat),
+        batch_throughput=metric(throughput(api.predict_loan_eligibility, batch_frame), 'rows/s'))
+
+    def chatbot_single(record):
+        result = ai_chatbot.predict_default_risk(**record)
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+
+    def chatbot_batch(batch):
+        for record in batch:
+            chatbot_single(record)
+
+    # The chatbot scores one applicant per conversation, so its "batch" is a loop of single calls
+    results['ai_chatbot.predict_default_risk'] = dict(
+        latency(chatbot_single, records, repeat),
+        batch_throughput=metric(throughput(chatbot_batch, records[:200], repeat=1), 'rows/s'))
+
+    def post_single(record):
+        response = client.post('/predict', json=record)
+        if response.status_code != 200:
+            raise RuntimeError(response.get_data(as_text=True))
+
+    def post_batch(batch):
+        response = client.post('/predict/batch', json=batch)
+        if response.status_code != 200:
+            raise RuntimeError(response.get_data(as_text=True))
+
+    results['flask /predict'] = latency(post_single, records, repeat)
+    results['flask /predict/batch'] = {'batch_throughput': metric(throughput(post_batch, batch_records), 'rows/s')}
+    return results
+
+
+def bench_training(data, n_rows):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'train.csv')
+        write_scaled_dataset(data, path, n_rows)
+        seconds, peak = run_training(['--data', path], workdir)
+    return {f'train_model.py ({n_rows} rows)': {'training_time': metric(seconds, 's'), 'peak_rss': metric(peak, 'MiB')}}
+
+
+def compare(results, baseline, tolerance):
+    """Print each metric next to the baseline; return the list of regressions."""
+    regressions = []
+    print(f"{'benchmark':<34} {'metric':<18} {'value':>18} {'baseline':>12} {'change':>8}")
+    for name, metrics in results['results'].items():
+        for key, current in metrics.items():
+            previous = baseline.get('results', {}).get(name, {}).get(key)
+            value = f"{current['value']:.4g} {current['unit']}"
+            if previous is None or not previous['value']:
+                print(f"{name:<34} {key:<18} {value:>18} {'-':>12}")
+                continue
+            change = current['value'] / previous['value'] - 1.0
+            worse = change > tolerance if LOWER_IS_BETTER[current['unit']] else change < -tolerance
+            worse = worse and abs(current['value'] - previous['value']) > NOISE_FLOOR[current['unit']]
+            flag = '  REGRESSION' if worse else ''
+            print(f"{name:<34} {key:<18} {value:>18} {previous['value']:>12.4g} {change:>+8.1%}{flag}")
+            if worse:
+                regressions.append((name, key, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='credit_risk_dataset.csv')
+    parser.add_argument('--models', nargs='+', default=['loan_model.pkl', 'loan_model_fast'])
+    parser.add_argument('--repeat', type=int, default=300, help="single-row calls per entry point")
+    parser.add_argument('--batch-rows', type=int, default=10000, help="rows in the synthetic throughput batch")
+    parser.add_argument('--train-rows', type=int, default=32581, help="rows in the synthetic training set")
+    parser.add_argument('--quick', action='store_true', help="skip the training benchmark")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative slowdown per metric before it counts as a regression")
+    parser.add_argument('--update-baseline', metavar='PATH', help="also write the results as the new baseline")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    base = pd.read_csv(args.data)
+    columns = numeric_features + categorical_features
+    frame = base.sample(frac=1.0, random_state=args.seed)[columns].dropna().reset_index(drop=True)
+    records = frame.astype(object).to_dict(orient='records')
+    batch = scale_up(base, args.batch_rows, rng)[columns]
+    batch_records = batch.astype(object).where(batch.notna(), None).to_dict(orient='records')
+
+    results = {'metadata': machine_metadata(), 'config': vars(args), 'results': {}}
+    results['results'].update(bench_model_load(args.models))
+    results['results'].update(bench_entry_points(frame, records, batch, batch_records, args.repeat))
+    if not args.quick:
+        results['results'].update(bench_training(args.data, args.train_rows))
+
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    if args.update_baseline:
+        with open(args.update_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('metadata', {}).get('cpu') != results['metadata']['cpu']:
+            print(f"warning: baseline was recorded on a different CPU ({baseline.get('metadata', {}).get('cpu')})")
+    regressions = compare(results, baseline, args.tolerance)
+    print(f"Results written to {args.output}")
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
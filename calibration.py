@@ -0,0 +1,65 @@
+import json
+import os
+import numpy as np
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+
+CALIBRATION_METHODS = ['isotonic', 'sigmoid', 'none']
+
+
+def fit_calibration(probability, y, method='isotonic'):
+    """Fit a probability calibration map and return it as a JSON-serializable dict.
+
+    probability holds uncalibrated P(loan_status=1) for labelled rows the model did
+    not train on (e.g. the forest's out-of-bag estimates); y holds their labels.
+    """
+    probability = np.asarray(probability, dtype=np.float64)
+    y = np.asarray(y)
+    if method == 'none':
+        return {'method': 'none'}
+    if method == 'isotonic':
+        isotonic = IsotonicRegression(out_of_bounds='clip', y_min=0.0, y_max=1.0).fit(probability, y)
+        return {'method': 'isotonic',
+                'x': isotonic.X_thresholds_.tolist(),
+                'y': isotonic.y_thresholds_.tolist()}
+    if method == 'sigmoid':
+        # Platt scaling on the raw probability
+        platt = LogisticRegression(C=1e6).fit(probability.reshape(-1, 1), y)
+        return {'method': 'sigmoid', 'a': float(platt.coef_[0, 0]), 'b': float(platt.intercept_[0])}
+    raise ValueError(f"Unknown calibration method '{method}'; choose from {CALIBRATION_METHODS}")
+
+
+def fit_oob_calibration(model_pipeline, y_train, method='isotonic'):
+    """Calibrate a fitted pipeline from its forest's out-of-bag probabilities (needs oob_score=True)."""
+    forest = model_pipeline.named_steps['classifier']
+    oob = forest.oob_decision_function_[:, list(forest.classes_).index(1)]
+    seen = ~np.isnan(oob)  # rows that were in-bag for every tree have no OOB estimate
+    return fit_calibration(oob[seen], np.asarray(y_train)[seen], method)
+
+
+def apply_calibration(calibration, probability):
+    """Map uncalibrated P(loan_status=1) through a calibration dict from fit_calibration()."""
+    probability = np.asarray(probability, dtype=np.float64)
+    if calibration is None or calibration['method'] == 'none':
+        return probability
+    if calibration['method'] == 'isotonic':
+        return np.interp(probability, calibration['x'], calibration['y'])
+    return 1.0 / (1.0 + np.exp(-(calibration['a'] * probability + calibration['b'])))
+
+
+def calibration_path(model_path):
+    """Calibration sidecar stored next to a model artifact, e.g. loan_model_calibration.json."""
+    return os.path.splitext(model_path)[0] + '_calibration.json'
+
+
+def save_calibration(calibration, path):
+    with open(path, 'w') as calibration_file:
+        json.dump(calibration, calibration_file, indent=2)
+
+
+def load_calibration(path):
+    try:
+        with open(path) as calibration_file:
+            return json.load(calibration_file)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,162 @@
+"""Typed columnar binary format for the credit risk dataset.
+
+A dataset directory holds one .npy file per column plus manifest.json.
+Categorical columns are stored as small-int codes (-1 for missing) with their
+dictionary in the manifest; numeric columns are downcast to the smallest dtype
+that round-trips every value exactly. Columns open memory-mapped, so loading is
+zero-copy and the pages are shared by every process reading the same dataset.
+
+    python columnar.py credit_risk_dataset.csv credit_risk_dataset.cols
+"""
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+MANIFEST = 'manifest.json'
+INTEGER_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+class _ColumnProfile:
+    """First-pass summary used to pick a column's storage type."""
+
+    def __init__(self):
+        self.categorical = False
+        self.saw_numeric = False
+        self.values = set()
+        self.has_nan = False
+        self.integral = True
+        self.float32_exact = True
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def mixed(self):
+        # A string column with some all-numeric chunks: their values must be re-read as text
+        return self.categorical and self.saw_numeric
+
+    def update(self, column):
+        if not pd.api.types.is_numeric_dtype(column):
+            self.categorical = True
+            self.values.update(column.dropna().astype(str).unique())
+            return
+        self.saw_numeric = True
+        values = column.to_numpy(dtype=np.float64)
+        present = values[~np.isnan(values)]
+        self.has_nan |= present.size < values.size
+        if present.size:
+            self.integral &= bool(np.all(present == np.round(present)))
+            self.float32_exact &= bool(np.all(present.astype(np.float32).astype(np.float64) == present))
+            self.min = min(self.min, present.min())
+            self.max = max(self.max, present.max())
+
+    def spec(self, name):
+        if self.categorical:
+            categories = sorted(self.values)
+            dtype = np.int8 if len(categories) < 128 else np.int16 if len(categories) < 32768 else np.int32
+            return {'name': name, 'kind': 'categorical', 'dtype': np.dtype(dtype).name, 'categories': categories}
+        if self.integral and not self.has_nan:
+            for dtype in INTEGER_DTYPES:
+                info = np.iinfo(dtype)
+                if info.min <= self.min and self.max <= info.max:
+                    return {'name': name, 'kind': 'numeric', 'dtype': np.dtype(dtype).name}
+        dtype = np.float32 if self.float32_exact else np.float64
+        return {'name': name, 'kind': 'numeric', 'dtype': np.dtype(dtype).name}
+
+
+def convert_csv(csv_path, out_dir, chunksize=100000):
+    """Convert a CSV file into a columnar dataset directory in two streaming passes."""
+    # Pass 1: pick dtypes and category dictionaries
+    profiles = {}
+    n_rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        for name in chunk.columns:
+            profiles.setdefault(name, _ColumnProfile()).update(chunk[name])
+        n_rows += len(chunk)
+    # Chunks are typed independently, so a column can parse as numbers in one chunk and as
+    # strings in another; collect such columns' categories from their original text instead
+    mixed = [name for name, profile in profiles.items() if profile.mixed]
+    if mixed:
+        for name in mixed:
+            profiles[name] = _ColumnProfile()
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, usecols=mixed, dtype=str):
+            for name in mixed:
+                profiles[name].update(chunk[name])
+    specs = [profile.spec(name) for name, profile in profiles.items()]
+
+    # Pass 2: write every column into a preallocated .npy file (categories read as text)
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = {spec['name']: open_memmap(os.path.join(out_dir, spec['name'] + '.npy'), mode='w+',
+                                         dtype=spec['dtype'], shape=(n_rows,))
+               for spec in specs}
+    text_columns = {spec['name']: str for spec in specs if spec['kind'] == 'categorical'}
+    start = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=text_columns):
+        stop = start + len(chunk)
+        for spec in specs:
+            column = chunk[spec['name']]
+            if spec['kind'] == 'categorical':
+                # Missing values fall outside the dictionary and get code -1
+                outputs[spec['name']][start:stop] = pd.Categorical(
+                    column.astype(str), categories=spec['categories']).codes
+            else:
+                outputs[spec['name']][start:stop] = column.to_numpy()
+        start = stop
+    for output in outputs.values():
+        output.flush()
+
+    with open(os.path.join(out_dir, MANIFEST), 'w') as manifest_file:
+        json.dump({'format_version': 1, 'n_rows': n_rows, 'columns': specs}, manifest_file, indent=2)
+
+
+def is_columnar(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+class ColumnarDataset:
+    """Read-only view of a columnar dataset directory."""
+
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, MANIFEST)) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.n_rows = manifest['n_rows']
+        self.specs = {spec['name']: spec for spec in manifest['columns']}
+        self.names = list(self.specs)
+        self.columns = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if mmap else None)
+                        for name in self.names}
+
+    def __len__(self):
+        return self.n_rows
+
+    def categories(self, name):
+        return self.specs[name].get('categories')
+
+    def column(self, name, start=None, stop=None):
+        """A column slice as a NumPy array (numeric) or pandas Categorical (categorical)."""
+        values = self.columns[name][start:stop]
+        categories = self.categories(name)
+        if categories is None:
+            return values
+        return pd.Categorical.from_codes(values, categories=categories)
+
+    def to_frame(self, columns=None, start=None, stop=None):
+        columns = columns or self.names
+        # copy=False keeps numeric columns as views of the (read-only) memory map
+        return pd.DataFrame({name: self.column(name, start, stop) for name in columns}, copy=False)
+
+    def iter_frames(self, chunksize=100000, columns=None):
+        for start in range(0, self.n_rows, chunksize):
+            yield self.to_frame(columns, start, min(start + chunksize, self.n_rows))
+
+
+def load_columnar(path, mmap=True):
+    return ColumnarDataset(path, mmap)
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else 'credit_risk_dataset.csv'
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + '.cols'
+    convert_csv(source, target)
+    print(f"Converted '{source}' into columnar dataset '{target}'")
@@ -0,0 +1,401 @@
+import hashlib
+import json
+import os
+import sys
+import pickle
+import time
+from importlib.metadata import version
+import numpy as np
+import pandas as pd
+
+from calibration import calibration_path, load_calibration
+
+# Arrays making up a compiled model, saved as <name>.npy inside the artifact directory
+ARRAY_NAMES = ['num_fill', 'num_mean', 'num_scale', 'cat_fill', 'cat_offset',
+               'roots', 'children', 'feature', 'threshold', 'value', 'leaf_index', 'leaf_contrib']
+
+# Versioned artifact format: a manifest.json (schema, versions, metrics, calibration and
+# the dtype, shape and SHA-256 of every array) next to uncompressed .npy blocks
+ARTIFACT_FORMAT = 'loan-model'
+ARTIFACT_FORMAT_VERSION = 3  # 2 added the leaf_index / leaf_contrib explanation tables, 3 merged left/right into children
+SUPPORTED_FORMAT_VERSIONS = {3}
+MANIFEST_NAME = 'manifest.json'
+
+
+class ArtifactError(ValueError):
+    """Raised when a model artifact is missing, corrupt or doesn't fit this code."""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as block_file:
+        for chunk in iter(lambda: block_file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _replace_atomically(path, write):
+    # Write a new file and rename it over the old one: processes that still have the old
+    # block memory-mapped keep reading the old inode instead of a half-written file
+    with open(path + '.tmp', 'wb') as new_file:
+        write(new_file)
+    os.replace(path + '.tmp', path)
+
+
+def _leaf_contributions(tree, output_field, n_fields, positive):
+    # Saabas attribution: every split on the root-to-leaf path moves P(positive class) from
+    # the parent's value to the child's; that change is credited to the split's input field
+    node_value = tree.value[:, 0, :]
+    probability = node_value[:, positive] / node_value.sum(axis=1)
+    path = np.zeros((tree.node_count, n_fields))
+    frontier = np.array([0])
+    while frontier.size:
+        internal = frontier[tree.children_left[frontier] != -1]
+        field = output_field[tree.feature[internal]]
+        children = []
+        for child in (tree.children_left[internal], tree.children_right[internal]):
+            path[child] = path[internal]
+            path[child, field] += probability[child] - probability[internal]
+            children.append(child)
+        frontier = np.concatenate(children)
+    leaves = np.flatnonzero(tree.children_left == -1)
+    return leaves, path[leaves]
+
+
+def compile_pipeline(pipeline):
+    """Flatten a fitted train_model pipeline into NumPy lookup tables and node arrays."""
+    preprocessor = pipeline.named_steps['preprocessor']
+    forest = pipeline.named_steps['classifier']
+    num_steps = preprocessor.named_transformers_['num'].named_steps
+    cat_steps = preprocessor.named_transformers_['cat'].named_steps
+    numeric_features = list(preprocessor.transformers_[0][2])
+    categorical_features = list(preprocessor.transformers_[1][2])
+
+    # Preprocessing: imputer means, scaler parameters and one-hot category maps
+    scaler = num_steps['scaler']
+    categories = [[str(value) for value in cats] for cats in cat_steps['onehot'].categories_]
+    cat_fill = [categories[j].index(str(value)) if str(value) in categories[j] else -1
+                for j, value in enumerate(cat_steps['imputer'].statistics_)]
+    cat_offset = np.cumsum([len(numeric_features)] + [len(cats) for cats in categories[:-1]])
+    # Input field behind every transformed column: one-hot columns belong to their categorical field
+    output_field = np.concatenate([np.arange(len(numeric_features))] +
+                                  [np.full(len(cats), len(numeric_features) + j) for j, cats in enumerate(categories)])
+    n_fields = len(numeric_features) + len(categorical_features)
+    positive = list(forest.classes_).index(1)
+
+    # Trees: concatenate every estimator's nodes; children[node] holds the left and right child
+    # (one gather per traversal step), and leaves point to themselves so a finished traversal
+    # is detected by the node not changing
+    # Explanations: each leaf's per-field contributions to P(loan_status=1), found by
+    # leaf_contrib[leaf_index[leaf]] for the leaves a prediction ends in
+    roots, children, feature, threshold, value = [], [], [], [], []
+    leaf_index, leaf_contrib = [], []
+    offset = n_leaves = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        own = np.arange(tree.node_count) + offset
+        roots.append(offset)
+        children.append(np.column_stack([np.where(is_leaf, own, tree.children_left + offset),
+                                         np.where(is_leaf, own, tree.children_right + offset)]))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        node_value = tree.value[:, 0, :]
+        value.append(node_value / node_value.sum(axis=1, keepdims=True))
+        leaves, contributions = _leaf_contributions(tree, output_field, n_fields, positive)
+        tree_leaf_index = np.full(tree.node_count, -1)
+        tree_leaf_index[leaves] = np.arange(len(leaves)) + n_leaves
+        leaf_index.append(tree_leaf_index)
+        leaf_contrib.append(contributions)
+        offset += tree.node_count
+        n_leaves += len(leaves)
+
+    arrays = {
+        'num_fill': np.asarray(num_steps['imputer'].statistics_, dtype=np.float64),
+        'num_mean': np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(len(numeric_features)), dtype=np.float64),
+        'num_scale': np.asarray(scaler.scale_ if scaler.with_std else np.ones(len(numeric_features)), dtype=np.float64),
+        'cat_fill': np.asarray(cat_fill, dtype=np.int64),
+        'cat_offset': np.asarray(cat_offset, dtype=np.int64),
+        'roots': np.asarray(roots, dtype=np.int64),
+        'children': np.concatenate(children).astype(np.int64),
+        'feature': np.concatenate(feature).astype(np.int64),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'value': np.concatenate(value).astype(np.float64),
+        'leaf_index': np.concatenate(leaf_index).astype(np.int64),
+        'leaf_contrib': np.concatenate(leaf_contrib).astype(np.float32),
+    }
+    meta = {
+        'numeric_features': numeric_features,
+        'categorical_features': categorical_features,
+        'categories': categories,
+        'classes': [int(c) for c in forest.classes_],
+        'n_outputs': int(len(numeric_features) + sum(len(cats) for cats in categories)),
+        'max_depth': int(max(estimator.tree_.max_depth for estimator in forest.estimators_)),
+    }
+    return meta, arrays
+
+
+def export_compiled_model(pipeline, path, calibration=None, metrics=None):
+    """Write a fitted pipeline as a versioned model artifact in the directory `path`.
+
+    The arrays are written first and the manifest last, so a reader never sees a
+    manifest that describes blocks which aren't on disk yet.
+    """
+    schema, arrays = compile_pipeline(pipeline)
+    os.makedirs(path, exist_ok=True)
+    blocks = {}
+    for name in ARRAY_NAMES:
+        array = np.ascontiguousarray(arrays[name])
+        block_path = os.path.join(path, name + '.npy')
+        _replace_atomically(block_path, lambda block_file: np.save(block_file, array))
+        blocks[name] = {'file': name + '.npy', 'dtype': array.dtype.str, 'shape': list(array.shape),
+                        'sha256': file_sha256(block_path)}
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'sklearn_version': version('scikit-learn'),
+        'numpy_version': np.__version__,
+        'schema': schema,
+        'calibration': calibration,
+        'metrics': metrics or {},
+        'arrays': blocks,
+    }
+    # The model version identifies what scores are computed from, not when they were written
+    identity = json.dumps({key: manifest[key] for key in ('format_version', 'schema', 'calibration', 'arrays')},
+                          sort_keys=True)
+    manifest['version'] = hashlib.sha256(identity.encode()).hexdigest()[:12]
+    _replace_atomically(os.path.join(path, MANIFEST_NAME),
+                        lambda manifest_file: manifest_file.write(json.dumps(manifest, indent=2).encode()))
+
+    # Files of older formats: meta.json from before the versioned format, left/right blocks
+    # from before format 3
+    for legacy_name in ('meta.json', 'left.npy', 'right.npy'):
+        legacy = os.path.join(path, legacy_name)
+        if os.path.exists(legacy):
+            os.remove(legacy)
+    return manifest
+
+
+def read_manifest(path):
+    """The manifest of the artifact directory `path`, checked for a supported format version."""
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            raise ArtifactError(f"'{path}' was compiled before the versioned artifact format; "
+                                f"re-export it with: python fast_inference.py loan_model.pkl {path}")
+        raise ArtifactError(f"No model artifact manifest at '{manifest_path}'")
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get('format') != ARTIFACT_FORMAT or manifest.get('format_version') not in SUPPORTED_FORMAT_VERSIONS:
+        raise ArtifactError(f"'{path}' is a {manifest.get('format')} v{manifest.get('format_version')} artifact; "
+                            f"this code reads {ARTIFACT_FORMAT} v{sorted(SUPPORTED_FORMAT_VERSIONS)}. Re-export it "
+                            f"with: python fast_inference.py loan_model.pkl {path}")
+    missing = [name for name in ARRAY_NAMES if name not in manifest.get('arrays', {})]
+    if missing:
+        raise ArtifactError(f"Manifest of '{path}' lists no {', '.join(missing)} array")
+    return manifest
+
+
+def _check_schema(path, schema, arrays):
+    # Cheap consistency checks between the manifest schema and the array shapes, so a
+    # mismatched artifact fails at load instead of at the first prediction
+    n_numeric = len(schema['numeric_features'])
+    n_outputs = n_numeric + sum(len(cats) for cats in schema['categories'])
+    problems = []
+    if len(schema['categories']) != len(schema['categorical_features']):
+        problems.append("one category list per categorical feature")
+    for name in ('num_fill', 'num_mean', 'num_scale'):
+        if arrays[name].shape != (n_numeric,):
+            problems.append(f"{name} of shape ({n_numeric},)")
+    for name in ('cat_fill', 'cat_offset'):
+        if arrays[name].shape != (len(schema['categorical_features']),):
+            problems.append(f"{name} with one entry per categorical feature")
+    if schema['n_outputs'] != n_outputs:
+        problems.append(f"n_outputs == {n_outputs}")
+    n_nodes = arrays['feature'].shape[0]
+    if arrays['children'].shape != (n_nodes, 2) or arrays['threshold'].shape != (n_nodes,):
+        problems.append("one children pair, feature and threshold per node")
+    if arrays['value'].shape != (n_nodes, len(schema['classes'])):
+        problems.append(f"value of shape ({n_nodes}, {len(schema['classes'])})")
+    n_fields = n_numeric + len(schema['categorical_features'])
+    if arrays['leaf_index'].shape != (n_nodes,) or arrays['leaf_contrib'].ndim != 2 \
+            or arrays['leaf_contrib'].shape[1] != n_fields:
+        problems.append(f"leaf_index of shape ({n_nodes},) and leaf_contrib with {n_fields} columns")
+    if problems:
+        raise ArtifactError(f"Model artifact '{path}' is inconsistent; expected " + '; '.join(problems))
+
+
+class CompiledModel:
+    """Scores applicants with the compiled arrays, without pandas or scikit-learn."""
+
+    def __init__(self, meta, arrays, manifest=None):
+        self.meta = meta
+        self.manifest = manifest
+        self.version = manifest['version'] if manifest else None
+        self.numeric_features = meta['numeric_features']
+        self.categorical_features = meta['categorical_features']
+        self.features = self.numeric_features + self.categorical_features
+        self.classes_ = np.asarray(meta['classes'])
+        self.calibration = meta.get('calibration')
+        self.category_codes = [{value: code for code, value in enumerate(cats)} for cats in meta['categories']]
+        self.n_numeric = len(self.numeric_features)
+        self.n_outputs = meta['n_outputs']
+        self.tree_major_rows = 2048  # batch size above which trees are walked one at a time
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        # Left and right child of node i at 2*i and 2*i+1 (a view, so a memory-mapped file stays shared)
+        self.child = self.children.reshape(-1)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None, verify=True):
+        """Open a model artifact directory, raising ArtifactError if it is unusable.
+
+        With verify=True every block is checked against its manifest SHA-256 (and
+        read once, warming the page cache). Processes that open an artifact the
+        parent already verified can pass verify=False to load in about a millisecond.
+        """
+        manifest = read_manifest(path)
+        arrays = {}
+        for name in ARRAY_NAMES:
+            block = manifest['arrays'][name]
+            block_path = os.path.join(path, block['file'])
+            if verify and file_sha256(block_path) != block['sha256']:
+                raise ArtifactError(f"'{block_path}' doesn't match the SHA-256 in its manifest")
+            array = np.load(block_path, mmap_mode=mmap_mode, allow_pickle=False)
+            if array.dtype.str != block['dtype'] or list(array.shape) != block['shape']:
+                raise ArtifactError(f"'{block_path}' holds {array.dtype.str}{list(array.shape)}, "
+                                    f"manifest says {block['dtype']}{block['shape']}")
+            arrays[name] = array
+        _check_schema(path, manifest['schema'], arrays)
+        return cls(dict(manifest['schema'], calibration=manifest['calibration']), arrays, manifest)
+
+    def check_features(self, numeric_features, categorical_features):
+        """Fail fast if the artifact expects different input columns than the caller provides."""
+        if self.numeric_features != list(numeric_features) or self.categorical_features != list(categorical_features):
+            raise ArtifactError(f"Model artifact expects features {self.numeric_features + self.categorical_features}, "
+                                f"this code provides {list(numeric_features) + list(categorical_features)}")
+
+    def encode(self, records):
+        """Turn applicant dicts into the 2-D array layout accepted by predict_proba()."""
+        X = np.empty((len(records), len(self.features)), dtype=np.float64)
+        for i, record in enumerate(records):
+            for j, name in enumerate(self.numeric_features):
+                value = record.get(name)
+                X[i, j] = np.nan if value is None else value
+            for j, name in enumerate(self.categorical_features):
+                value = record.get(name)
+                missing = value is None or value != value  # None or NaN, as encode_frame() treats them
+                X[i, self.n_numeric + j] = np.nan if missing else self.category_codes[j].get(str(value), -1)
+        return X
+
+    def encode_frame(self, frame):
+        """Vectorized encode() for a DataFrame holding the model input columns."""
+        X = np.empty((len(frame), len(self.features)), dtype=np.float64)
+        X[:, :self.n_numeric] = frame[self.numeric_features].to_numpy(dtype=np.float64, na_value=np.nan)
+        for j, name in enumerate(self.categorical_features):
+            column = frame[name]
+            codes = pd.Categorical(column.astype(str), categories=self.meta['categories'][j]).codes.astype(np.float64)
+            codes[column.isna().to_numpy()] = np.nan  # missing, as opposed to unknown (-1)
+            X[:, self.n_numeric + j] = codes
+        return X
+
+    def transform(self, X):
+        """Apply imputation, scaling and one-hot encoding to an encoded array."""
+        n = X.shape[0]
+        Xt = np.zeros((n, self.n_outputs), dtype=np.float32)
+
+        numeric = X[:, :self.n_numeric]
+        numeric = np.where(np.isnan(numeric), self.num_fill, numeric)
+        Xt[:, :self.n_numeric] = (numeric - self.num_mean) / self.num_scale
+
+        codes = X[:, self.n_numeric:]
+        codes = np.where(np.isnan(codes), self.cat_fill, codes).astype(np.int64)
+        rows, cols = np.nonzero(codes >= 0)  # unknown categories (-1) encode to all zeros
+        Xt[rows, self.cat_offset[cols] + codes[rows, cols]] = 1.0
+        return Xt
+
+    def predict_proba(self, X):
+        """Class probabilities for a 2-D array from encode(): numeric columns first
+        (NaN for missing), then category codes (-1 for unknown, NaN for missing)."""
+        return self.predict_proba_transformed(self.transform(np.asarray(X, dtype=np.float64)))
+
+    def predict_proba_transformed(self, Xt):
+        """Class probabilities for rows already passed through transform()."""
+        if Xt.shape[0] >= self.tree_major_rows:
+            return sum(self.value[node] for node in self._tree_leaves(Xt)) / len(self.roots)
+        return self.value[self._leaves(Xt)].mean(axis=1)
+
+    def _walk(self, flat, base, node):
+        # Move every node in place down to its leaf; flat is the row-major Xt and base[i] is
+        # the offset of node[i]'s row in it. A pair is dropped the step after it stops moving
+        # (leaves are their own children), which saves looking up whether the child is a leaf.
+        active = np.arange(node.size)
+        while active.size:
+            current = node[active]
+            go_right = flat[base[active] + self.feature[current]] > self.threshold[current]
+            child = self.child[2 * current + go_right]
+            node[active] = child
+            active = active[child != current]
+        return node
+
+    def _leaves(self, Xt):
+        # Small batches: walk every (row, tree) pair at once; returns a (rows, trees) array of leaves
+        n_trees = len(self.roots)
+        base = np.repeat(np.arange(Xt.shape[0]) * Xt.shape[1], n_trees)
+        node = self._walk(np.ascontiguousarray(Xt).ravel(), base, np.tile(self.roots, Xt.shape[0]))
+        return node.reshape(Xt.shape[0], n_trees)
+
+    def _tree_leaves(self, Xt):
+        # Large batches: one tree at a time keeps the index arrays small and cache friendly
+        flat = np.ascontiguousarray(Xt).ravel()
+        base = np.arange(Xt.shape[0]) * Xt.shape[1]
+        for root in self.roots:
+            yield self._walk(flat, base, np.full(Xt.shape[0], root))
+
+    @property
+    def bias(self):
+        """P(loan_status=1) before any split: the mean root value over the trees."""
+        return float(self.value[self.roots, list(self.classes_).index(1)].mean())
+
+    def explain_transformed(self, Xt):
+        """Class probabilities and per-field contributions for rows already passed through transform().
+
+        Both come from one traversal: contributions[i, j] is how much input field
+        self.features[j] moved row i's P(loan_status=1) away from self.bias, so each
+        row's contributions sum to its probability minus the bias.
+        """
+        n_trees = len(self.roots)
+        if Xt.shape[0] < self.tree_major_rows:
+            leaves = self._leaves(Xt)
+            contributions = self.leaf_contrib[self.leaf_index[leaves]].sum(axis=1, dtype=np.float64)
+            return self.value[leaves].mean(axis=1), contributions / n_trees
+        proba = np.zeros((Xt.shape[0], self.value.shape[1]))
+        contributions = np.zeros((Xt.shape[0], len(self.features)))
+        for node in self._tree_leaves(Xt):
+            proba += self.value[node]
+            contributions += self.leaf_contrib[self.leaf_index[node]]
+        return proba / n_trees, contributions / n_trees
+
+    def explain(self, X):
+        """explain_transformed() for a 2-D array from encode()."""
+        return self.explain_transformed(self.transform(np.asarray(X, dtype=np.float64)))
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def predict_proba_records(self, records):
+        return self.predict_proba(self.encode(records))
+
+    def predict_proba_dict(self, record):
+        return self.predict_proba(self.encode([record]))[0]
+
+
+# Compile an existing pickled pipeline: python fast_inference.py [loan_model.pkl] [loan_model_fast]
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else 'loan_model.pkl'
+    target = sys.argv[2] if len(sys.argv) > 2 else 'loan_model_fast'
+    with open(source, 'rb') as model_file:
+        export_compiled_model(pickle.load(model_file), target, load_calibration(calibration_path(source)))
+    print(f"Compiled '{source}' into '{target}'")
@@ -0,0 +1,361 @@
+"""Incremental retraining on newly labelled loans, gated by feature drift.
+
+train_model.py leaves a state directory next to the model (loan_model_state/)
+with the preprocessing statistics over the whole book, a bounded uniform sample
+of it and reference histograms of every input feature. An update then streams
+only the new loans:
+
+  * the imputer and scaler statistics are merged with the new rows and installed
+    in place; split thresholds on scaled features are remapped, so every existing
+    tree keeps making the same decisions on the raw values;
+  * the oldest --refresh-trees trees are replaced by trees grown (warm start) on
+    the sample of the book, which now includes the new loans;
+  * the new loans are compared with the reference histograms (PSI per feature).
+    When any feature drifts past --drift-threshold, or a category the encoder
+    has never seen appears, the forest is retrained from scratch on the book
+    instead.
+
+    python incremental.py --new new_loans.csv --book credit_risk_dataset.csv
+    python incremental.py --new new_loans.csv --check   # drift report only
+
+The cost of an update depends on the new rows and the sample size, not on the
+size of the book.
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from calibration import apply_calibration, calibration_path, load_calibration
+from streaming_train import CSV_DTYPES, Reservoir, StreamingStats, install_statistics, iter_chunks
+from train_model import numeric_features, categorical_features, target, save_model
+
+# Conventional reading of the population stability index: < 0.1 stable, 0.1-0.25 moderate
+# shift, > 0.25 significant shift (the model no longer describes the population)
+DEFAULT_DRIFT_THRESHOLD = 0.25
+
+# Quantile bins per numeric feature in the drift histograms, and the share that stands in
+# for an empty bin so PSI stays finite
+PSI_BINS = 10
+PSI_EPSILON = 1e-4
+
+STATE_FILE = 'state.json'
+SAMPLE_FILE = 'sample.csv'
+
+
+def state_path(model_path):
+    """Incremental training state stored next to a model, e.g. loan_model_state/."""
+    return os.path.splitext(model_path)[0] + '_state'
+
+
+def population_stability(expected, actual):
+    expected = np.maximum(expected / max(expected.sum(), 1), PSI_EPSILON)
+    actual = np.maximum(actual / max(actual.sum(), 1), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class FeatureHistograms:
+    """Streaming histograms of every model input on fixed bins.
+
+    Numeric features use quantile edges from a reference sample plus a bin for
+    missing values; categorical features count each known category, missing
+    values and categories outside the vocabulary.
+    """
+
+    def __init__(self, edges, vocabularies):
+        self.edges = [np.asarray(feature_edges, dtype=np.float64) for feature_edges in edges]
+        self.vocabularies = [list(vocabulary) for vocabulary in vocabularies]
+        self.numeric_counts = [np.zeros(len(feature_edges) + 2) for feature_edges in self.edges]
+        self.category_counts = [np.zeros(len(vocabulary) + 2) for vocabulary in self.vocabularies]
+        self._codes = [{value: code for code, value in enumerate(vocabulary)} for vocabulary in self.vocabularies]
+
+    @classmethod
+    def from_sample(cls, frame, bins=PSI_BINS):
+        quantiles = np.linspace(0.0, 1.0, bins + 1)[1:-1]
+        edges = [np.unique(np.nanquantile(frame[name].to_numpy(dtype=np.float64), quantiles))
+                 for name in numeric_features]
+        vocabularies = [sorted(frame[name].dropna().astype(str).unique()) for name in categorical_features]
+        histograms = cls(edges, vocabularies)
+        histograms.update(frame)
+        return histograms
+
+    def empty(self):
+        """Histograms on the same bins with no rows counted."""
+        return FeatureHistograms(self.edges, self.vocabularies)
+
+    def update(self, chunk):
+        for counts, edges, name in zip(self.numeric_counts, self.edges, numeric_features):
+            values = chunk[name].to_numpy(dtype=np.float64)
+            bins = np.where(np.isnan(values), len(edges) + 1, np.searchsorted(edges, values, side='right'))
+            counts += np.bincount(bins, minlength=len(counts))
+        for counts, codes, name in zip(self.category_counts, self._codes, categorical_features):
+            column = chunk[name].astype(object)
+            known = column.map(codes).to_numpy(dtype=np.float64)
+            bins = np.where(column.isna(), len(codes), np.where(np.isnan(known), len(codes) + 1, known))
+            counts += np.bincount(bins.astype(np.intp), minlength=len(counts))
+
+    def psi(self, current):
+        """PSI of each feature, from these (reference) histograms to `current`."""
+        counts = zip(self.numeric_counts + self.category_counts, current.numeric_counts + current.category_counts)
+        return {name: population_stability(expected, actual)
+                for name, (expected, actual) in zip(numeric_features + categorical_features, counts)}
+
+    def unseen_categories(self):
+        """Categorical features with values outside the reference vocabulary."""
+        return [name for name, counts in zip(categorical_features, self.category_counts) if counts[-1] > 0]
+
+    def to_dict(self):
+        return {'edges': [edges.tolist() for edges in self.edges], 'vocabularies': self.vocabularies,
+                'numeric_counts': [counts.tolist() for counts in self.numeric_counts],
+                'category_counts': [counts.tolist() for counts in self.category_counts]}
+
+    @classmethod
+    def from_dict(cls, state):
+        histograms = cls(state['edges'], state['vocabularies'])
+        histograms.numeric_counts = [np.asarray(counts) for counts in state['numeric_counts']]
+        histograms.category_counts = [np.asarray(counts) for counts in state['category_counts']]
+        return histograms
+
+
+class BookState:
+    """What an incremental update needs to know about the loans the model has seen.
+
+    stats covers every training row of the book (never the held-out test split),
+    sample is a bounded uniform sample of those rows that new trees are grown on,
+    and reference holds the feature histograms of the book at the last full
+    training, which drift is measured against.
+    """
+
+    def __init__(self, stats, sample, reference, metrics=None, updates=None, random_state=42):
+        self.stats = stats
+        self.sample = sample
+        self.reference = reference
+        self.metrics = metrics or {}
+        self.updates = updates or []
+        self.random_state = random_state
+
+    @classmethod
+    def build(cls, train, stats=None, sample_size=200000, metrics=None, random_state=42):
+        """State of a freshly trained model from the rows it was trained on (inputs and target).
+
+        stats can be passed when they were already gathered over more rows than
+        train holds, as streaming training does over every row it fits the sample of.
+        """
+        if stats is None:
+            stats = StreamingStats()
+            stats.update(train)
+        sample = Reservoir(sample_size, np.random.default_rng(random_state))
+        sample.add(train)
+        return cls(stats, sample, FeatureHistograms.from_sample(sample.frame()), metrics, random_state=random_state)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.sample.rows.to_csv(os.path.join(path, SAMPLE_FILE + '.tmp'), index=False)
+        os.replace(os.path.join(path, SAMPLE_FILE + '.tmp'), os.path.join(path, SAMPLE_FILE))
+        state = {'stats': self.stats.to_dict(), 'reference': self.reference.to_dict(), 'metrics': self.metrics,
+                 'updates': self.updates, 'sample_size': self.sample.size, 'random_state': self.random_state}
+        with open(os.path.join(path, STATE_FILE + '.tmp'), 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(os.path.join(path, STATE_FILE + '.tmp'), os.path.join(path, STATE_FILE))
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(os.path.join(path, STATE_FILE)):
+            raise FileNotFoundError(f"No incremental training state in '{path}'; retrain with train_model.py first")
+        with open(os.path.join(path, STATE_FILE)) as state_file:
+            state = json.load(state_file)
+        # Every update draws fresh reservoir keys and tree seeds
+        rng = np.random.default_rng([state['random_state'], len(state['updates'])])
+        sample = Reservoir(state['sample_size'], rng)
+        dtypes = dict(CSV_DTYPES, **{name: object for name in categorical_features})
+        sample.rows = pd.read_csv(os.path.join(path, SAMPLE_FILE), dtype=dtypes)
+        return cls(StreamingStats.from_dict(state['stats']), sample, FeatureHistograms.from_dict(state['reference']),
+                   state['metrics'], state['updates'], state['random_state'])
+
+
+def scaled(raw, feature, mean, scale):
+    """Raw values of the given numeric features as the trees compare them: scaled, then float32."""
+    return ((raw - mean[feature]) / scale[feature]).astype(np.float32)
+
+
+def on_cut_values(threshold, feature, mean, scale):
+    """(raw value on each split's cut point, whether it is one).
+
+    The raw cut is rounded to the decimals float32 resolves at the threshold (the
+    midpoint of ages 37 and 39 is 38, not 38.0000003); that value is on the cut
+    when it scales to within one float32 step of the threshold. Continuous fields
+    rarely have one.
+    """
+    raw = threshold * scale[feature] + mean[feature]
+    error = scale[feature] * np.spacing(np.abs(threshold).astype(np.float32))
+    decimals = np.clip(np.floor(-np.log10(4 * error)), 0, 15).astype(int)
+    on_cut = raw.copy()
+    for places in np.unique(decimals):
+        on_cut[decimals == places] = np.round(raw[decimals == places], places)
+    image = scaled(on_cut, feature, mean, scale)
+    return on_cut, np.abs(image - threshold) <= np.spacing(np.abs(image))
+
+
+def remap_thresholds(forest, old_mean, old_scale, new_mean, new_scale):
+    """Move split thresholds on scaled numeric features to the new scaler, keeping their raw cut points.
+
+    Values the trees saw stay on the same side of every split. A value that falls
+    exactly on a cut point was sent left or right by float32 rounding; there the
+    new threshold is the float32 value it now scales to, stepped down with
+    np.nextafter if it went right, so it still goes the same way.
+    """
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        # Numeric features come first in the transformed matrix; leaves have feature -2
+        split = (tree.feature >= 0) & (tree.feature < len(old_mean))
+        feature = tree.feature[split]
+        threshold = tree.threshold[split]
+        raw = threshold * old_scale[feature] + old_mean[feature]
+        on_cut, tie = on_cut_values(threshold, feature, old_mean, old_scale)
+        left = scaled(on_cut, feature, old_mean, old_scale) <= threshold
+        image = scaled(on_cut, feature, new_mean, new_scale)
+        tree.threshold[split] = np.where(tie, np.where(left, image, np.nextafter(image, np.float32(-np.inf))),
+                                         (raw - new_mean[feature]) / new_scale[feature])
+
+
+def refresh_trees(forest, X, y, n_trees, seed):
+    """Replace the n_trees oldest trees of a fitted forest with trees grown on (X, y).
+
+    Trees stay in the order they were grown, so the ones dropped are always the oldest.
+    """
+    if not 0 < n_trees <= len(forest.estimators_):
+        raise ValueError(f"Can refresh between 1 and {len(forest.estimators_)} trees, not {n_trees}")
+    params = forest.get_params()
+    forest.set_params(warm_start=True, oob_score=False, n_estimators=len(forest.estimators_) + n_trees,
+                      random_state=seed)
+    forest.fit(X, y)
+    forest.estimators_ = forest.estimators_[n_trees:]
+    forest.set_params(**{name: params[name] for name in ('warm_start', 'oob_score', 'n_estimators', 'random_state')})
+    # The out-of-bag estimates described the replaced trees
+    for name in ('oob_score_', 'oob_decision_function_'):
+        if hasattr(forest, name):
+            delattr(forest, name)
+
+
+def append_to_book(book, new_data, chunksize=100000):
+    """Append the new loans to a CSV book, in the book's column order."""
+    if not book.endswith('.csv'):
+        raise ValueError(f"New loans can only be appended to a CSV book, not '{book}'")
+    columns = list(pd.read_csv(book, nrows=0).columns)
+    for chunk in iter_chunks(new_data, chunksize):
+        chunk.reindex(columns=columns).to_csv(book, mode='a', header=False, index=False)
+
+
+def update_model(model_path, new_data, compiled_output='loan_model_fast', book=None, refresh=10,
+                 drift_threshold=DEFAULT_DRIFT_THRESHOLD, chunksize=100000, stream=False, check_only=False):
+    """Fold newly labelled loans into the model; returns a report dict.
+
+    report['action'] is 'incremental' (statistics updated and trees refreshed),
+    'full_retrain' (drift; retrained on the book with the new loans appended),
+    'drift' (drift, but no book to retrain on, so nothing was changed) or
+    'checked' (check_only).
+    """
+    started = time.perf_counter()
+    with open(model_path, 'rb') as model_file:
+        model_pipeline = pickle.load(model_file)
+    calibration = load_calibration(calibration_path(model_path))
+    state = BookState.load(state_path(model_path))
+    positive = list(model_pipeline.classes_).index(1)
+
+    # One pass over the new loans: drift histograms, statistics, book sample, and how the
+    # current model does on them (they are out of sample for every tree)
+    current = state.reference.empty()
+    n_rows = correct = squared_error = 0
+    for chunk in iter_chunks(new_data, chunksize):
+        current.update(chunk)
+        X, y = chunk.drop(columns=target), chunk[target].to_numpy()
+        X[categorical_features] = X[categorical_features].astype(object)
+        raw = model_pipeline.predict_proba(X)[:, positive]
+        n_rows += len(chunk)
+        correct += int(np.sum((raw > 0.5) == (y == 1)))
+        squared_error += float(np.sum((apply_calibration(calibration, raw) - y) ** 2))
+        if not check_only:
+            state.stats.update(chunk)
+            state.sample.add(chunk)
+    if n_rows == 0:
+        raise ValueError(f"No labelled loans in '{new_data}'")
+
+    psi = state.reference.psi(current)
+    drifted = sorted({name for name, value in psi.items() if value > drift_threshold} | set(current.unseen_categories()))
+    report = {'new_rows': n_rows, 'accuracy': correct / n_rows, 'brier': squared_error / n_rows, 'psi': psi,
+              'drifted': drifted}
+
+    if check_only:
+        report['action'] = 'checked'
+    elif drifted and book is None:
+        report['action'] = 'drift'
+    elif drifted:
+        from train_model import main as train
+        append_to_book(book, new_data, chunksize)
+        train(['--data', book, '--output', model_path, '--compiled-output', compiled_output]
+              + (['--stream', '--chunksize', str(chunksize)] if stream else []))
+        report['action'] = 'full_retrain'
+    else:
+        preprocessor = model_pipeline.named_steps['preprocessor']
+        scaler = preprocessor.named_transformers_['num'].named_steps['scaler']
+        old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+        install_statistics(preprocessor, state.stats)
+        forest = model_pipeline.named_steps['classifier']
+        remap_thresholds(forest, old_mean, old_scale, scaler.mean_, scaler.scale_)
+
+        sample = state.sample.frame()
+        seed = int(state.sample.rng.integers(2 ** 31))
+        refresh_trees(forest, preprocessor.transform(sample.drop(columns=target)), sample[target], refresh, seed)
+
+        state.updates.append({'at': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'new_rows': n_rows,
+                              'book_rows': state.stats.n_rows, 'refreshed_trees': refresh,
+                              'max_psi': max(psi.values()), 'accuracy_before': report['accuracy'],
+                              'brier_before': report['brier']})
+        save_model(model_pipeline, model_path, compiled_output, calibration,
+                   dict(state.metrics, last_update=state.updates[-1]))
+        state.save(state_path(model_path))
+        if book is not None:
+            append_to_book(book, new_data, chunksize)
+        report['action'] = 'incremental'
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--new', required=True, help="newly labelled loans: CSV, Parquet or columnar dataset directory")
+    parser.add_argument('--model', default='loan_model.pkl', help="pickled pipeline to update (its state directory sits next to it)")
+    parser.add_argument('--compiled-output', default='loan_model_fast', help="where to write the model artifact")
+    parser.add_argument('--book', help="CSV of every labelled loan; the new loans are appended to it, and it is "
+                                       "retrained on when drift is detected")
+    parser.add_argument('--refresh-trees', type=int, default=10, help="oldest trees replaced per update")
+    parser.add_argument('--drift-threshold', type=float, default=DEFAULT_DRIFT_THRESHOLD,
+                        help="PSI above which a feature counts as drifted and the model is retrained from scratch")
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--stream', action='store_true', help="stream the book when a full retrain is needed")
+    parser.add_argument('--check', action='store_true', help="only report drift and current model quality")
+    args = parser.parse_args(argv)
+
+    report = update_model(args.model, args.new, args.compiled_output, args.book, args.refresh_trees,
+                          args.drift_threshold, args.chunksize, args.stream, args.check)
+    print(f"{report['new_rows']} new loans; current model accuracy {report['accuracy']:.4f}, "
+          f"Brier score {report['brier']:.4f}")
+    for name, value in sorted(report['psi'].items(), key=lambda item: -item[1]):
+        print(f"  PSI {name:<28} {value:.4f}{'  DRIFT' if name in report['drifted'] else ''}")
+    if report['action'] == 'incremental':
+        print(f"Updated statistics and refreshed {args.refresh_trees} trees in {report['seconds']:.1f}s")
+    elif report['action'] == 'full_retrain':
+        print(f"Drift in {', '.join(report['drifted'])}; retrained on '{args.book}' in {report['seconds']:.1f}s")
+    elif report['action'] == 'drift':
+        print(f"Drift in {', '.join(report['drifted'])}; pass --book to retrain from scratch. Model unchanged.")
+        sys.exit(2)
+    elif report['drifted']:
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Table-driven intake for the chatbot: a field schema compiled into a state machine.
+
+Each schema entry describes one applicant field declaratively:
+
+    {'name': 'person_age', 'type': int, 'min': 18, 'max': 100,
+     'prompt': "What is your age?",
+     'range_error': "Please enter a valid age between 18 and 100.",
+     'type_error': "Please enter a valid numeric age.",
+     'labels': ['age'], 'suffixes': [r'years?\\s+old']}
+
+Choice fields use 'choices' (plus optional 'synonyms' and 'free' for values that
+may appear anywhere in a sentence) instead of 'type'/'min'/'max'. IntakeMachine
+compiles all patterns once, so one message can fill several fields, e.g.
+"I'm 30 years old, income $52,000, I rent".
+"""
+import re
+
+# Enumerable fields with at most this many candidate values can be scored speculatively
+SPECULATION_MAX_CANDIDATES = 128
+
+_NUMBER = r'\$?\s*(-?\d[\d,]*(?:\.\d+)?)\s*(k\b)?'
+_FILLER = r'(?:\s*(?:(?:is|of|for|at|about|around|was|are)\b|[=:]))*\s*'
+
+
+def _words(values):
+    # Longest first so 'credit history' wins over 'history'
+    return '|'.join(sorted((value.replace(' ', r'\s+') for value in values), key=len, reverse=True))
+
+
+class IntakeMachine:
+    """Compiled intake state machine over a field schema.
+
+    The machine is stateless; the collected values live in the caller's session,
+    so one instance can be shared by every session. The state is the first field
+    in schema order that is still missing.
+    """
+
+    def __init__(self, schema):
+        self.schema = {field['name']: field for field in schema}
+        self.order = [field['name'] for field in schema]
+        self._label_patterns = []
+        self._free_patterns = []
+        for field in schema:
+            name = field['name']
+            value = self._value_pattern(field)
+            if field.get('labels'):
+                self._label_patterns.append(
+                    (name, re.compile(rf"\b(?:{_words(field['labels'])})\b{_FILLER}{value}", re.IGNORECASE)))
+            if field.get('suffixes'):
+                self._label_patterns.append(
+                    (name, re.compile(rf"{value}\s*(?:{'|'.join(field['suffixes'])})", re.IGNORECASE)))
+            if field.get('free'):
+                self._free_patterns.append(
+                    (name, re.compile(rf"\b(?:{_words(field['free'])})\b", re.IGNORECASE)))
+        self._bare_number = re.compile(_NUMBER, re.IGNORECASE)
+
+    @staticmethod
+    def _value_pattern(field):
+        if 'choices' not in field:
+            return _NUMBER
+        return rf"\b({_words(list(field['choices']) + list(field.get('synonyms', {})))})\b"
+
+    def next_field(self, collected):
+        """The current state: the first required field not collected yet (None when complete)."""
+        for name in self.order:
+            if name not in collected:
+                return name
+        return None
+
+    def prompt(self, name):
+        return self.schema[name]['prompt']
+
+    def parse_value(self, name, text, suffix=None):
+        """Validate one raw value for a field; returns (value, error message or None)."""
+        field = self.schema[name]
+        if 'choices' in field:
+            text = ' '.join(text.lower().split())
+            value = field.get('synonyms', {}).get(text, re.sub(r'[\s_-]+', '', text.upper()))
+            if value in field['choices']:
+                return value, None
+            return None, field['range_error']
+        try:
+            value = float(text.replace(',', '').replace('$', '').strip())
+        except ValueError:
+            return None, field['type_error']
+        if suffix:
+            value *= 1000
+        if field['type'] is int:
+            if not value.is_integer():
+                return None, field['type_error']
+            value = int(value)
+        if value < field.get('min', float('-inf')) or value > field.get('max', float('inf')):
+            return None, field['range_error']
+        return value, None
+
+    def extract(self, message):
+        """Labelled and free-standing field values found anywhere in a message.
+
+        Returns {field: (raw value, thousands suffix)}; a span of text is claimed by
+        at most one field.
+        """
+        found = {}
+        claimed = []
+
+        def claim(name, match, group):
+            start, end = match.span(group)
+            if name in found or any(start < e and s < end for s, e in claimed):
+                return
+            claimed.append((start, end))
+            found[name] = (match.group(group), match.group(2) if match.re.groups > 1 else None)
+
+        for name, pattern in self._label_patterns:
+            for match in pattern.finditer(message):
+                claim(name, match, 1)
+        for name, pattern in self._free_patterns:
+            for match in pattern.finditer(message):
+                claim(name, match, 0)
+        return found
+
+    def step(self, collected, message):
+        """Advance the machine with one user message.
+
+        Returns (updates, errors): validated values to merge into collected and
+        error messages for values that were recognized but invalid. A message with
+        no recognizable field is read as the answer to the current field.
+        """
+        updates, errors = {}, []
+        extracted = self.extract(message)
+        if not extracted:
+            current = self.next_field(collected)
+            if current is None:
+                return updates, errors
+            extracted = {current: self._bare_value(current, message)}
+        for name, (raw, suffix) in extracted.items():
+            value, error = self.parse_value(name, raw, suffix)
+            if error:
+                errors.append(error)
+            else:
+                updates[name] = value
+        return updates, errors
+
+    def _bare_value(self, name, message):
+        # "10 years" or "$52,000" answer a numeric question; otherwise the message is the value
+        if 'choices' not in self.schema[name]:
+            numbers = self._bare_number.findall(message)
+            if len(numbers) == 1:
+                return numbers[0]
+        return message, None
+
+    def candidates(self, name):
+        """All values a field can take, if there are few enough to score speculatively."""
+        field = self.schema[name]
+        if 'choices' in field:
+            values = list(field['choices'])
+        elif field['type'] is int and 'min' in field and 'max' in field:
+            values = list(range(field['min'], field['max'] + 1))
+        else:
+            return None
+        return values if len(values) <= SPECULATION_MAX_CANDIDATES else None
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Defaults, overridable per process through the environment
+DEFAULT_ANSWER_CACHE_SIZE = int(os.environ.get('LLM_CACHE_SIZE', 1000))
+DEFAULT_ANSWER_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL', 3600))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+DEFAULT_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', 30))
+
+
+class GatewayBusy(RuntimeError):
+    """Raised when no upstream slot frees up within the queue timeout."""
+
+
+class GroqBackend:
+    """Streams chat completions from a Groq (or any base_url-compatible) client.
+
+    Keep one instance per process: the client holds the pooled HTTP connections.
+    """
+
+    def __init__(self, client, model):
+        self.client = client
+        self.model = model
+
+    def stream(self, messages, max_tokens):
+        chunks = self.client.chat.completions.create(model=self.model, messages=messages,
+                                                     max_tokens=max_tokens, stream=True)
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def normalize_question(text):
+    """Case, whitespace and punctuation-insensitive form used for exact-match caching."""
+    return ' '.join(re.sub(r'[^\w\s%$]', ' ', text.lower()).split())
+
+
+class AnswerCache:
+    """Thread-safe LRU cache with TTL for complete LLM answers."""
+
+    def __init__(self, maxsize=DEFAULT_ANSWER_CACHE_SIZE, ttl=DEFAULT_ANSWER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, answer = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return answer
+
+    def put(self, key, answer):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LLMGateway:
+    """Front door for LLM calls: answer cache, concurrency limit and streaming metrics."""
+
+    def __init__(self, backend, cache=None, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.backend = backend
+        self.cache = cache if cache is not None else AnswerCache()
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.cache_hits = 0
+        self.upstream_calls = 0
+        self.errors = 0
+        self.ttft_ms = []  # time to first token of recent upstream calls
+        self.cache_hit_ms = []
+
+    def cache_key(self, messages, max_tokens):
+        # Only the final user turn is normalized; system prompt and settings must match exactly
+        *context, question = messages
+        payload = [getattr(self.backend, 'model', None), max_tokens, context,
+                   question['role'], normalize_question(question['content'])]
+        return hashlib.blake2b(json.dumps(payload).encode(), digest_size=16).hexdigest()
+
+    def stream(self, messages, max_tokens=500):
+        """Yield the answer as text chunks; cached answers arrive as a single chunk."""
+        started = time.perf_counter()
+        key = self.cache_key(messages, max_tokens)
+        with self._lock:
+            self.requests += 1
+
+        answer = self.cache.get(key)
+        if answer is not None:
+            self._record('cache_hit_ms', started, hit=True)
+            yield answer
+            return
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.errors += 1
+            raise GatewayBusy(f"No LLM capacity within {self.queue_timeout}s")
+        try:
+            with self._lock:
+                self.upstream_calls += 1
+            parts = []
+            for text in self.backend.stream(messages, max_tokens):
+                if not parts:
+                    self._record('ttft_ms', started)
+                parts.append(text)
+                yield text
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self._slots.release()
+        # Only a stream that ran to the end with some text is an answer worth repeating; an
+        # empty reply would otherwise be served for every repeat of the question until the TTL
+        answer = ''.join(parts)
+        if answer.strip():
+            self.cache.put(key, answer)
+
+    def complete(self, messages, max_tokens=500):
+        return ''.join(self.stream(messages, max_tokens))
+
+    def _record(self, series, started, hit=False):
+        with self._lock:
+            samples = getattr(self, series)
+            samples.append(1000.0 * (time.perf_counter() - started))
+            del samples[:-1000]  # keep a bounded window of recent samples
+            if hit:
+                self.cache_hits += 1
+
+    def stats(self):
+        def percentiles(samples):
+            ordered = sorted(samples)
+            if not ordered:
+                return {'p50': None, 'p95': None}
+            return {'p50': ordered[len(ordered) // 2], 'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]}
+
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'cache_hits': self.cache_hits,
+                'cache_hit_rate': self.cache_hits / self.requests if self.requests else 0.0,
+                'cached_answers': len(self.cache),
+                'upstream_calls': self.upstream_calls,
+                'errors': self.errors,
+                'ttft_ms': percentiles(self.ttft_ms),
+                'cache_hit_ms': percentiles(self.cache_hit_ms),
+            }
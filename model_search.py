@@ -0,0 +1,167 @@
+"""Model selection over a grid of estimators with cross-validation on all cores.
+
+Each fold's ColumnTransformer is fit once and its output matrices are shared by
+every candidate, so the search only pays for fitting and scoring the classifiers.
+
+    python model_search.py --folds 5 --jobs -1 --output leaderboard.csv
+    python model_search.py --grid my_grid.json
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier, HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+from train_model import build_preprocessor, target
+
+ESTIMATORS = {
+    'random_forest': RandomForestClassifier,
+    'extra_trees': ExtraTreesClassifier,
+    'hist_gradient_boosting': HistGradientBoostingClassifier,
+    'logistic_regression': LogisticRegression,
+}
+
+# Parameter grid per estimator; override with --grid path/to/grid.json in the same shape
+DEFAULT_GRID = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [None, 12, 20],
+        'class_weight': [None, 'balanced'],
+    },
+    'hist_gradient_boosting': {
+        'max_iter': [100, 300],
+        'learning_rate': [0.1, 0.05],
+        'max_depth': [None, 8],
+        'class_weight': [None, 'balanced'],
+    },
+    'logistic_regression': {
+        'C': [0.1, 1.0],
+        'class_weight': [None, 'balanced'],
+        'max_iter': [1000],
+    },
+}
+
+
+def expand_grid(grid):
+    """List of (estimator name, params) for every combination in the grid."""
+    candidates = []
+    for name, param_grid in grid.items():
+        if name not in ESTIMATORS:
+            raise ValueError(f"Unknown estimator '{name}'; choose from {sorted(ESTIMATORS)}")
+        keys = sorted(param_grid)
+        for values in itertools.product(*(param_grid[key] for key in keys)):
+            candidates.append((name, dict(zip(keys, values))))
+    return candidates
+
+
+def preprocess_folds(path, fingerprint, n_splits, random_state):
+    """Fit the preprocessor once per fold and return dense float32 (X_fit, y_fit, X_val, y_val) tuples.
+
+    fingerprint only serves as part of the on-disk cache key so edits to the data invalidate it.
+    """
+    df = pd.read_csv(path)
+    X, y = df.drop(columns=target), df[target].to_numpy()
+    # Keep the same hold-out split as train_model.py out of the search entirely
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    folds = []
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    for fit_index, val_index in splitter.split(X_train, y_train):
+        preprocessor = build_preprocessor().set_params(sparse_threshold=0)
+        X_fit = preprocessor.fit_transform(X_train.iloc[fit_index]).astype(np.float32)
+        X_val = preprocessor.transform(X_train.iloc[val_index]).astype(np.float32)
+        folds.append((X_fit, y_train[fit_index], X_val, y_train[val_index]))
+    return folds
+
+
+def evaluate(name, params, fold, random_state):
+    X_fit, y_fit, X_val, y_val = fold
+    estimator = ESTIMATORS[name](**params)
+    if 'random_state' in estimator.get_params():
+        estimator.set_params(random_state=random_state)
+
+    started = time.perf_counter()
+    estimator.fit(X_fit, y_fit)
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    proba = estimator.predict_proba(X_val)[:, 1]
+    predict_seconds = time.perf_counter() - started
+
+    return {
+        'accuracy': accuracy_score(y_val, estimator.classes_[(proba >= 0.5).astype(int)]),
+        'auc': roc_auc_score(y_val, proba),
+        'fit_seconds': fit_seconds,
+        'predict_us_per_row': 1e6 * predict_seconds / len(y_val),
+    }
+
+
+def pareto_front(leaderboard):
+    # A candidate is on the front if no other one has both higher AUC and lower predict latency
+    on_front = []
+    for _, row in leaderboard.iterrows():
+        dominated = ((leaderboard['auc'] >= row['auc'])
+                     & (leaderboard['predict_us_per_row'] <= row['predict_us_per_row'])
+                     & ((leaderboard['auc'] > row['auc'])
+                        | (leaderboard['predict_us_per_row'] < row['predict_us_per_row']))).any()
+        on_front.append(not dominated)
+    return on_front
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='credit_risk_dataset.csv')
+    parser.add_argument('--grid', help="JSON file with {estimator: {param: [values]}}")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=-1, help="worker processes (-1 = all cores)")
+    parser.add_argument('--cache-dir', help="persist preprocessed fold matrices between runs")
+    parser.add_argument('--output', default='leaderboard.csv', help="leaderboard CSV (or .json)")
+    parser.add_argument('--random-state', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid) as grid_file:
+            grid = json.load(grid_file)
+    candidates = expand_grid(grid)
+
+    stat = os.stat(args.data)
+    cached_preprocess = Memory(args.cache_dir, verbose=0).cache(preprocess_folds)
+    started = time.perf_counter()
+    folds = cached_preprocess(args.data, (stat.st_mtime_ns, stat.st_size), args.folds, args.random_state)
+    print(f"Prepared {len(folds)} folds in {time.perf_counter() - started:.1f}s; "
+          f"evaluating {len(candidates)} candidates")
+
+    # One task per (candidate, fold); joblib memory-maps the fold matrices into the workers
+    started = time.perf_counter()
+    results = Parallel(n_jobs=args.jobs)(
+        delayed(evaluate)(name, params, fold, args.random_state)
+        for name, params in candidates for fold in folds)
+    print(f"Search finished in {time.perf_counter() - started:.1f}s")
+
+    rows = []
+    for index, (name, params) in enumerate(candidates):
+        scores = pd.DataFrame(results[index * len(folds):(index + 1) * len(folds)])
+        rows.append(dict({'estimator': name, 'params': json.dumps(params)},
+                         **scores.mean().to_dict(), auc_std=scores['auc'].std()))
+    leaderboard = pd.DataFrame(rows).sort_values('auc', ascending=False).reset_index(drop=True)
+    leaderboard['pareto'] = pareto_front(leaderboard)
+
+    with pd.option_context('display.max_colwidth', 80, 'display.width', 200):
+        print(leaderboard.to_string(float_format=lambda value: f"{value:.4f}"))
+    if args.output.endswith('.json'):
+        leaderboard.to_json(args.output, orient='records', indent=2)
+    else:
+        leaderboard.to_csv(args.output, index=False)
+    print(f"Leaderboard written to '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
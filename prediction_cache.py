@@ -0,0 +1,134 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from train_model import numeric_features, categorical_features
+
+# Default limits, overridable per process through the environment
+DEFAULT_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+DEFAULT_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+
+# Seconds between stat() calls on the model artifact; a batch of lookups shares one check
+MODEL_CHECK_INTERVAL = 1.0
+
+
+def canonical_key(record):
+    """Stable hash of the model input fields of an applicant record.
+
+    Numbers are compared as floats (22 and 22.0 share an entry) and missing/NaN
+    values collapse to None; fields the model doesn't use are ignored.
+    """
+    values = []
+    for name in numeric_features:
+        value = record.get(name)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = None if value is None else str(value)
+        if isinstance(value, float) and math.isnan(value):
+            value = None
+        values.append(value)
+    for name in categorical_features:
+        value = record.get(name)
+        values.append(None if value is None or value != value else str(value))
+    return hashlib.blake2b(json.dumps(values).encode(), digest_size=16).hexdigest()
+
+
+def model_fingerprint(path):
+    """Cheap identity of a model artifact on disk; changes whenever the file is replaced."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with TTL for per-applicant prediction results.
+
+    Entries are dropped automatically when the model artifact at model_path changes
+    (checked at most every check_interval seconds). A maxsize of 0 disables caching.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, model_path='loan_model.pkl',
+                 check_interval=MODEL_CHECK_INTERVAL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.model_path = model_path
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint = model_fingerprint(model_path)
+        self._checked_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_model(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        fingerprint = model_fingerprint(self.model_path)
+        if fingerprint != self._fingerprint:
+            self._entries.clear()
+            self._fingerprint = fingerprint
+            self.invalidations += 1
+
+    def get(self, record):
+        """Return the cached result for record, or None on a miss."""
+        if self.maxsize <= 0:
+            return None
+        key = canonical_key(record)
+        with self._lock:
+            self._check_model()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, record, value):
+        if self.maxsize <= 0:
+            return
+        key = canonical_key(record)
+        with self._lock:
+            self._check_model()
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,108 @@
+"""Low-overhead sampling profiler that keeps flame graphs of slow requests only.
+
+While at least one request is in flight, a single daemon thread wakes every
+interval_ms and records the Python stack of each in-flight request thread.
+When a request finishes faster than threshold_ms its samples are dropped.
+Slower requests are written to output_dir in the folded-stack format read by
+flamegraph.pl and speedscope ("outer;inner;leaf count" per line). Nothing is
+sampled between requests, and the request threads themselves only do two dict
+updates, so it can stay on in production. Threads named in helper_threads (the
+micro-batcher, which runs the model for waiting requests) are sampled into
+every in-flight request, under a "[thread name]" root frame.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def _folded(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SlowRequestProfiler:
+    def __init__(self, threshold_ms, output_dir='profiles', interval_ms=5.0, max_dumps=200,
+                 helper_threads=('micro-batcher',)):
+        self.threshold = threshold_ms / 1000.0
+        self.output_dir = output_dir
+        self.interval = interval_ms / 1000.0
+        self.max_dumps = max_dumps
+        self.helper_threads = set(helper_threads)
+        self._active = {}  # thread id -> (start time, Counter of folded stacks)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _ensure_sampler(self):
+        # Started lazily, so a profiler created before fork gets a sampler in every worker
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+            self._thread.start()
+
+    def start(self):
+        """Begin sampling the calling thread; returns the token to pass to stop()."""
+        ident = threading.get_ident()
+        with self._lock:
+            self._ensure_sampler()
+            self._active[ident] = (time.perf_counter(), Counter())
+        self._wake.set()
+        return ident
+
+    def stop(self, token, name):
+        """Stop sampling; dump the samples if the request took longer than the threshold.
+
+        Returns the dump path, or None.
+        """
+        with self._lock:
+            started, samples = self._active.pop(token, (None, None))
+        if started is None:
+            return None
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold or not samples:
+            return None
+        return self._dump(name, elapsed, samples)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            helpers = [f"[{thread.name}];{_folded(frames[thread.ident])}" for thread in threading.enumerate()
+                       if thread.name in self.helper_threads and thread.ident in frames]
+            with self._lock:
+                for ident, (_, samples) in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[_folded(frame)] += 1
+                    for stack in helpers:
+                        samples[stack] += 1
+                if not self._active:
+                    self._wake.clear()
+            del frames
+
+    def _dump(self, name, elapsed, samples):
+        safe_name = ''.join(c if c.isalnum() else '_' for c in name).strip('_') or 'request'
+        path = os.path.join(self.output_dir,
+                            f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{safe_name}-{1000 * elapsed:.0f}ms.folded")
+        with open(path, 'w') as dump_file:
+            for stack, count in samples.most_common():
+                dump_file.write(f"{stack} {count}\n")
+        self._prune()
+        return path
+
+    def _prune(self):
+        # Keep only the newest max_dumps files
+        dumps = sorted((entry for entry in os.scandir(self.output_dir) if entry.name.endswith('.folded')),
+                       key=lambda entry: entry.stat().st_mtime)
+        for entry in dumps[:-self.max_dumps]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+import numpy as np
+
+from calibration import apply_calibration, calibration_path, load_calibration
+from fast_inference import MANIFEST_NAME, CompiledModel, compile_pipeline
+from metrics import BATCH_ROWS, MODEL_INFO, ROWS_SCORED, STAGE_SECONDS
+from prediction_cache import PredictionCache
+from train_model import numeric_features, categorical_features
+
+# loan_status = 1 is a default. The positive class is therefore the adverse decision: Not
+# Eligible in the API and app, High Default Risk in the chatbot. The probability and the risk
+# band are its probability, so a High band always goes with a likely decline.
+ADVERSE_CLASS = 1
+
+# Decision threshold on the calibrated P(loan_status=1) per product. Override or add
+# products with a JSON file {"product": threshold} named by DECISION_THRESHOLDS_FILE.
+DEFAULT_THRESHOLDS = {'default': 0.5}
+
+# Risk bands on the calibrated probability: (upper bound, band)
+RISK_BANDS = [(0.1, 'Low'), (0.3, 'Medium'), (1.0, 'High')]
+
+# Reason codes per decision: the input fields that pushed the score furthest toward it
+REASON_CODES = int(os.environ.get('REASON_CODES', 4))
+
+# The versioned artifact is preferred; the pickle is used only where no artifact was exported
+DEFAULT_ARTIFACT = 'loan_model_fast'
+DEFAULT_PICKLE = 'loan_model.pkl'
+
+
+class UnknownProductError(ValueError):
+    """Raised for a product with no configured decision threshold."""
+
+
+def default_model_path():
+    """The versioned model artifact if one has been exported, else the pickled pipeline."""
+    return DEFAULT_ARTIFACT if os.path.isdir(DEFAULT_ARTIFACT) else DEFAULT_PICKLE
+
+
+def load_thresholds(path=None):
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    path = path or os.environ.get('DECISION_THRESHOLDS_FILE')
+    if path:
+        with open(path) as thresholds_file:
+            thresholds.update(json.load(thresholds_file))
+    return thresholds
+
+
+def artifact_version(path):
+    """Short content hash of a model artifact (a file, or every file of a compiled directory)."""
+    paths = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+    digest = hashlib.blake2b(digest_size=6)
+    for artifact in paths:
+        with open(artifact, 'rb') as artifact_file:
+            for block in iter(lambda: artifact_file.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def risk_bands(probability):
+    bounds = np.array([bound for bound, _ in RISK_BANDS[:-1]])
+    names = np.array([name for _, name in RISK_BANDS])
+    return names[np.searchsorted(bounds, probability, side='right')]
+
+
+class Scorer:
+    """Shared scoring path for the API and apps.
+
+    One forest evaluation per applicant (cached by PredictionCache) yields the class,
+    the calibrated probability, the risk band for any product threshold and the
+    reason codes behind the decision.
+    model_path is a versioned model artifact directory (see fast_inference.py),
+    which is hash-checked and memory-mapped so processes share its pages, or a
+    pickled pipeline. It defaults to default_model_path().
+    """
+
+    def __init__(self, model_path=None, thresholds=None):
+        model_path = model_path or default_model_path()
+        self.model_path = model_path
+        self.compiled = os.path.isdir(model_path)
+        if self.compiled:
+            self.model = CompiledModel.load(model_path, mmap_mode='r')
+            self.model.check_features(numeric_features, categorical_features)
+            self.calibration = self.model.calibration
+            self.model_version = self.model.version
+            self.explainer = self.model
+        else:
+            with open(model_path, 'rb') as model_file:
+                self.model = pickle.load(model_file)
+            self.calibration = load_calibration(calibration_path(model_path))
+            self.model_version = artifact_version(model_path)
+            # Reason codes come from the compiled form's precomputed contribution tables
+            self.explainer = CompiledModel(*compile_pipeline(self.model))
+        self.loaded_at = time.time()
+        self.model_labels = {'model_path': model_path, 'model_version': self.model_version,
+                             'compiled': str(self.compiled).lower()}
+        MODEL_INFO.set(self.loaded_at, **self.model_labels)
+        self.thresholds = thresholds or load_thresholds()
+        # The manifest is replaced last when an artifact is re-exported
+        self.cache = PredictionCache(model_path=os.path.join(model_path, MANIFEST_NAME) if self.compiled else model_path)
+        self.positive = list(self.model.classes_).index(1)
+
+    def raw_scores(self, records):
+        """Uncalibrated P(loan_status=1) and its per-field contributions from a single forest pass.
+
+        Returns one row per record: the probability, then the contribution of each
+        model input field (numeric_features + categorical_features order).
+        """
+        BATCH_ROWS.observe(len(records), model_version=self.model_version)
+        with self.timed('encode'):
+            X = self.explainer.encode(records)
+        with self.timed('preprocess'):
+            Xt = self.explainer.transform(X)
+        with self.timed('forest'):
+            proba, contributions = self.explainer.explain_transformed(Xt)
+        return np.column_stack([proba[:, self.positive], contributions])
+
+    def reason_codes(self, contributions, prediction, k=REASON_CODES):
+        """The k input fields that pushed each applicant's P(loan_status=1) furthest toward its decision."""
+        toward = contributions * np.where(prediction == ADVERSE_CLASS, 1.0, -1.0)[:, None]
+        order = np.argsort(-toward, axis=1)[:, :k]
+        fields = numeric_features + categorical_features
+        return [[{'field': fields[j], 'contribution': float(row[j])} for j in top if row_toward[j] > 0]
+                for top, row, row_toward in zip(order, contributions, toward)]
+
+    def timed(self, stage):
+        """Context manager recording the duration of one scoring stage for this model version."""
+        return STAGE_SECONDS.time(stage=stage, model_version=self.model_version)
+
+    def threshold(self, product='default'):
+        try:
+            return self.thresholds[product]
+        except KeyError:
+            raise UnknownProductError(f"Unknown product '{product}'; configured products: {sorted(self.thresholds)}")
+
+    def finalize(self, raw_probability, product='default', contributions=None):
+        """Class, calibrated probability, risk band and (given contributions) reason codes
+        from raw forest probabilities."""
+        threshold = self.threshold(product)
+        probability = apply_calibration(self.calibration, raw_probability)
+        prediction = (probability >= threshold).astype(int)
+        results = [{'prediction': int(p), 'probability': float(q), 'raw_probability': float(r), 'risk_band': str(b)}
+                   for p, q, r, b in zip(prediction, probability, raw_probability, risk_bands(probability))]
+        if contributions is not None:
+            for result, reasons in zip(results, self.reason_codes(contributions, prediction)):
+                result['reasons'] = reasons
+        return results
+
+    def score_records(self, records, product='default', raw_scorer=None):
+        """Score applicant dicts, evaluating the forest only for records not in the cache.
+
+        raw_scorer(records) -> raw_scores() rows can replace the direct model call
+        (the API routes it through its micro-batcher).
+        """
+        self.threshold(product)  # fail fast on unknown products
+        ROWS_SCORED.inc(len(records), model_version=self.model_version)
+        with self.timed('cache_lookup'):
+            scores = [self.cache.get(record) for record in records]
+            missing = [i for i, value in enumerate(scores) if value is None]
+        if missing:
+            scored = (raw_scorer or self.raw_scores)([records[i] for i in missing])
+            for i, value in zip(missing, scored):
+                scores[i] = np.array(value, dtype=np.float64)  # a copy, not a view pinning the whole batch
+                self.cache.put(records[i], scores[i])
+        with self.timed('calibrate'):
+            scores = np.asarray(scores, dtype=np.float64).reshape(len(records), -1)
+            return self.finalize(scores[:, 0], product, scores[:, 1:])
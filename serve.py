@@ -0,0 +1,114 @@
+"""Production server for the scoring API: pre-forked gunicorn workers sharing one model.
+
+The model is loaded and warmed up once in the master process (preload), then
+the workers are forked from it and share its memory copy-on-write. gc.freeze()
+keeps the garbage collector from touching, and so copying, those pages. With the
+versioned model artifact (loan_model_fast, the default once exported) the node
+arrays are memory-mapped instead, and every worker reads the same page-cache copy.
+
+    python serve.py --workers 4 --threads 4 --bind 0.0.0.0:8000
+    kill -HUP <master pid>      # graceful reload onto a new model version
+
+On SIGHUP the master loads the new model (the current one keeps serving if that
+fails), forks fresh workers and lets the old ones finish their in-flight
+requests. --watch-model N sends that SIGHUP automatically when the model file
+changes. GET /healthz is the liveness probe and GET /readyz the readiness probe.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import threading
+import time
+from gunicorn.app.base import BaseApplication
+
+from fast_inference import MANIFEST_NAME
+from prediction_cache import model_fingerprint
+from scoring import default_model_path
+
+
+def artifact_fingerprint(path):
+    # A model artifact directory is rewritten in place; its manifest is replaced last
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_NAME)
+    return model_fingerprint(path)
+
+
+def watch_model(path, interval, log):
+    """Master-side thread that triggers a graceful reload when the model artifact changes."""
+    last = artifact_fingerprint(path)
+    while True:
+        time.sleep(interval)
+        current = artifact_fingerprint(path)
+        if current is not None and current != last:
+            last = current
+            log.info("Model %s changed on disk, reloading workers", path)
+            os.kill(os.getpid(), signal.SIGHUP)
+
+
+class ScoringServer(BaseApplication):
+    def __init__(self, options, watch_interval=0):
+        self.options = options
+        self.watch_interval = watch_interval
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('preload_app', True)
+        self.cfg.set('when_ready', self.when_ready)
+
+    def load(self):
+        import api
+        gc.freeze()
+        return api.app
+
+    def when_ready(self, server):
+        if self.watch_interval > 0:
+            import api
+            threading.Thread(target=watch_model, args=(api.MODEL_PATH, self.watch_interval, server.log),
+                             name='model-watcher', daemon=True).start()
+
+    def reload(self):
+        # SIGHUP: reload the configuration and the model in the master, before new workers are forked
+        super().reload()
+        import api
+        try:
+            api.reload_model()
+        except Exception as e:
+            logging.getLogger('gunicorn.error').error("Model reload failed, keeping the one loaded at %s: %s",
+                                                      time.ctime(api.scorer.loaded_at), e)
+        gc.freeze()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bind', default=os.environ.get('SERVE_BIND', '127.0.0.1:8000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count())))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('SERVE_THREADS', 4)),
+                        help="request threads per worker; concurrent requests in one worker share micro-batches")
+    parser.add_argument('--model', default=os.environ.get('MODEL_PATH', default_model_path()),
+                        help="model artifact directory to memory-map, or a pickled pipeline")
+    parser.add_argument('--timeout', type=int, default=30, help="seconds before a stuck worker is restarted")
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help="seconds old workers get to finish in-flight requests on reload or shutdown")
+    parser.add_argument('--watch-model', type=float, default=0, metavar='SECONDS',
+                        help="poll the model artifact and reload gracefully when it changes (0 disables)")
+    args = parser.parse_args(argv)
+
+    # api.py reads the model path at import, which happens once in the master
+    os.environ['MODEL_PATH'] = args.model
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+    }
+    ScoringServer(options, args.watch_model).run()
+
+
+if __name__ == '__main__':
+    main()
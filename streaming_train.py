@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from columnar import is_columnar, load_columnar
+from train_model import numeric_features, categorical_features, target, build_pipeline
+
+# Explicit column dtypes so chunks never fall back to object/float64 inference
+CSV_DTYPES = dict(
+    {name: 'float64' for name in numeric_features},
+    **{name: 'category' for name in categorical_features},
+    **{target: 'int8'}
+)
+
+
+def iter_chunks(path, chunksize=100000, columns=None):
+    """Yield DataFrame chunks of the given columns (default: model inputs and target)
+    from a CSV file, Parquet file or columnar dataset directory."""
+    columns = columns or numeric_features + categorical_features + [target]
+    dtypes = {name: dtype for name, dtype in CSV_DTYPES.items() if name in columns}
+    if is_columnar(path):
+        yield from load_columnar(path).iter_frames(chunksize, columns)
+    elif path.endswith('.parquet'):
+        import pyarrow.parquet as pq  # optional dependency, only needed for Parquet input
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas().astype(dtypes)
+    else:
+        yield from pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize)
+
+
+class StreamingStats:
+    """One-pass statistics matching what the pipeline's imputers, scaler and encoder learn."""
+
+    def __init__(self):
+        self.n_rows = 0
+        self.count = np.zeros(len(numeric_features))
+        self.mean = np.zeros(len(numeric_features))
+        self.m2 = np.zeros(len(numeric_features))
+        self.category_counts = [{} for _ in categorical_features]
+
+    def update(self, chunk):
+        self.n_rows += len(chunk)
+
+        # Merge per-column mean / sum of squared deviations (Chan et al.)
+        values = chunk[numeric_features].to_numpy(dtype=np.float64)
+        count = np.sum(~np.isnan(values), axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.nansum(values, axis=0) / count, 0.0)
+        m2 = np.nansum((values - mean) ** 2, axis=0)
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            self.m2 = self.m2 + m2 + np.where(total > 0, delta ** 2 * self.count * count / total, 0.0)
+        self.count = total
+
+        for counts, name in zip(self.category_counts, categorical_features):
+            # A 'category' column also reports its unobserved categories, with a count of 0
+            for value, n in chunk[name].value_counts().items():
+                if n:
+                    counts[value] = counts.get(value, 0) + int(n)
+
+    def imputer_means(self):
+        return self.mean.copy()
+
+    def scaler_variance(self):
+        # After mean imputation the filled rows sit exactly on the mean, so they
+        # add to the row count but not to the squared deviations
+        return self.m2 / self.n_rows
+
+    def most_frequent(self):
+        # Ties resolve to the smallest value, like SimpleImputer(strategy='most_frequent')
+        return [min(counts, key=lambda value: (-counts[value], value)) for counts in self.category_counts]
+
+    def vocabularies(self):
+        return [sorted(counts) for counts in self.category_counts]
+
+    def to_dict(self):
+        return {'n_rows': self.n_rows, 'count': self.count.tolist(), 'mean': self.mean.tolist(),
+                'm2': self.m2.tolist(), 'category_counts': self.category_counts}
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls()
+        stats.n_rows = state['n_rows']
+        stats.count = np.asarray(state['count'], dtype=np.float64)
+        stats.mean = np.asarray(state['mean'], dtype=np.float64)
+        stats.m2 = np.asarray(state['m2'], dtype=np.float64)
+        stats.category_counts = [dict(counts) for counts in state['category_counts']]
+        return stats
+
+
+def install_statistics(preprocessor, stats):
+    """Set a fitted preprocessor's imputer and scaler statistics from StreamingStats."""
+    num_steps = preprocessor.named_transformers_['num'].named_steps
+    num_steps['imputer'].statistics_ = stats.imputer_means()
+    scaler = num_steps['scaler']
+    scaler.mean_ = stats.imputer_means()
+    scaler.var_ = stats.scaler_variance()
+    scaler.scale_ = np.where(scaler.var_ > 0, np.sqrt(scaler.var_), 1.0)
+    scaler.n_samples_seen_ = stats.n_rows
+    cat_imputer = preprocessor.named_transformers_['cat'].named_steps['imputer']
+    cat_imputer.statistics_ = np.asarray(stats.most_frequent(), dtype=object)
+
+
+class Reservoir:
+    """Bounded uniform sample of rows across chunks (keeps the rows with the smallest random keys)."""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.rows = None
+
+    def add(self, chunk):
+        chunk = chunk.assign(_key=self.rng.random(len(chunk)))
+        for name in categorical_features:
+            chunk[name] = chunk[name].astype(object)
+        combined = chunk if self.rows is None else pd.concat([self.rows, chunk], ignore_index=True)
+        self.rows = combined.nsmallest(self.size, '_key') if len(combined) > self.size else combined
+
+    def frame(self):
+        return self.rows.drop(columns='_key').reset_index(drop=True)
+
+
+def train_streaming(path, chunksize=100000, sample_size=200000, test_fraction=0.2, random_state=42):
+    """Train the standard pipeline without loading the whole dataset.
+
+    Preprocessing statistics and category vocabularies are computed over every
+    training row in one pass; the forest is fit on a bounded uniform sample.
+    Returns (model_pipeline, X_train, y_train, X_test, y_test, stats) where X_train and
+    y_train are the sample the forest was fit on, the test set is a bounded sample too
+    and stats are the StreamingStats over every training row.
+    """
+    rng = np.random.default_rng(random_state)
+    stats = StreamingStats()
+    train_sample = Reservoir(sample_size, rng)
+    test_sample = Reservoir(max(1, int(sample_size * test_fraction)), rng)
+
+    for chunk in iter_chunks(path, chunksize):
+        is_test = rng.random(len(chunk)) < test_fraction
+        train_chunk = chunk[~is_test]
+        stats.update(train_chunk)
+        train_sample.add(train_chunk)
+        test_sample.add(chunk[is_test])
+
+    train = train_sample.frame()
+    test = test_sample.frame()
+    X_train, y_train = train.drop(columns=target), train[target]
+
+    # Fit the preprocessor on the sample for its structure, then install the full-data statistics
+    model_pipeline = build_pipeline()
+    model_pipeline.set_params(preprocessor__cat__onehot__categories=stats.vocabularies())
+    preprocessor = model_pipeline.named_steps['preprocessor']
+    preprocessor.fit(X_train)
+    install_statistics(preprocessor, stats)
+
+    model_pipeline.named_steps['classifier'].fit(preprocessor.transform(X_train), y_train)
+    print(f"Streamed {stats.n_rows} training rows; forest fit on a sample of {len(train)}")
+    return model_pipeline, X_train, y_train, test.drop(columns=target), test[target], stats
@@ -1,3 +1,4 @@
+import argparse
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
@@ -5,64 +6,139 @@ from sklearn.compose import ColumnTransformer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
-from sklearn.metrics import classification_report, accuracy_score
+from sklearn.metrics import classification_report, accuracy_score, brier_score_loss
 import pickle
 
-# Load the dataset
-df = pd.read_csv('credit_risk_dataset.csv')
+from calibration import CALIBRATION_METHODS, fit_oob_calibration, apply_calibration, calibration_path, save_calibration
 
-# Check for missing values in the dataset
-print("Missing values in each column:")
-print(df.isnull().sum())
+from columnar import is_columnar, load_columnar
+from fast_inference import export_compiled_model
 
-# Fill missing numerical data using SimpleImputer (mean strategy)
+# Model input features (shared with the API and apps that score applicants)
 numeric_features = ['person_age', 'person_income', 'person_emp_length', 'loan_amnt', 'loan_int_rate', 'loan_percent_income', 'cb_person_cred_hist_length']
 categorical_features = ['person_home_ownership', 'loan_intent', 'loan_grade', 'cb_person_default_on_file']
+target = 'loan_status'
 
-# Create preprocessing pipelines for numerical and categorical features
-numeric_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='mean')),  # Handle missing numerical data
-    ('scaler', StandardScaler())  # Scale numerical data
-])
-
-categorical_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='most_frequent')),  # Handle missing categorical data
-    ('onehot', OneHotEncoder(handle_unknown='ignore'))  # One-hot encode categorical data
-])
-
-# Combine both transformers into a single ColumnTransformer
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', numeric_transformer, numeric_features),
-        ('cat', categorical_transformer, categorical_features)
+
+def build_preprocessor():
+    # Create preprocessing pipelines for numerical and categorical features
+    numeric_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='mean')),  # Handle missing numerical data
+        ('scaler', StandardScaler())  # Scale numerical data
+    ])
+
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),  # Handle missing categorical data
+        ('onehot', OneHotEncoder(handle_unknown='ignore'))  # One-hot encode categorical data
     ])
 
-# Prepare the feature matrix and target variable
-X = df.drop('loan_status', axis=1)  # Features
-y = df['loan_status']  # Target variable
+    # Combine both transformers into a single ColumnTransformer
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, numeric_features),
+            ('cat', categorical_transformer, categorical_features)
+        ])
+
+
+def build_pipeline():
+    # Create a pipeline that first applies preprocessing, then trains the RandomForest model
+    return Pipeline(steps=[
+        ('preprocessor', build_preprocessor()),  # Apply preprocessing
+        # Random Forest Classifier; out-of-bag probabilities are kept to fit the calibration
+        ('classifier', RandomForestClassifier(n_estimators=100, random_state=42, oob_score=True))
+    ])
+
+
+def save_model(model_pipeline, output='loan_model.pkl', compiled_output='loan_model_fast', calibration=None,
+               metrics=None):
+    # Save the trained model to a pickle file, with its probability calibration alongside
+    with open(output, 'wb') as model_file:
+        pickle.dump(model_pipeline, model_file)
+    if calibration is not None:
+        save_calibration(calibration, calibration_path(output))
+
+    print(f"Model trained and saved as '{output}'")
+
+    # Export the versioned, pandas-free model artifact (with its evaluation metrics) for scoring
+    manifest = export_compiled_model(model_pipeline, compiled_output, calibration, metrics)
+    print(f"Model artifact exported to '{compiled_output}' (version {manifest['version']})")
+
+
+def load_dataset(path):
+    # Columnar dataset directories (see columnar.py) open memory-mapped; anything else is CSV
+    if is_columnar(path):
+        return load_columnar(path).to_frame()
+    return pd.read_csv(path)
+
+
+def train_in_memory(path):
+    # Load the dataset
+    df = load_dataset(path)
+
+    # Check for missing values in the dataset
+    print("Missing values in each column:")
+    print(df.isnull().sum())
+
+    # Prepare the feature matrix and target variable
+    X = df.drop(target, axis=1)  # Features
+    y = df[target]  # Target variable
+
+    # Split data into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Train the model
+    model_pipeline = build_pipeline()
+    model_pipeline.fit(X_train, y_train)
+    return model_pipeline, X_train, y_train, X_test, y_test
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the loan eligibility model.")
+    parser.add_argument('--data', default='credit_risk_dataset.csv', help="training data: CSV, columnar dataset directory, or Parquet with --stream")
+    parser.add_argument('--output', default='loan_model.pkl', help="where to write the pickled pipeline")
+    parser.add_argument('--compiled-output', default='loan_model_fast', help="where to write the compiled model")
+    parser.add_argument('--stream', action='store_true', help="stream the data in chunks instead of loading it into memory")
+    parser.add_argument('--chunksize', type=int, default=100000, help="rows per chunk in --stream mode")
+    parser.add_argument('--sample-size', type=int, default=200000, help="max rows the forest is fit on in --stream mode and in incremental updates")
+    parser.add_argument('--calibration', choices=CALIBRATION_METHODS, default='isotonic', help="probability calibration fitted on out-of-bag predictions")
+    args = parser.parse_args(argv)
+
+    if args.stream:
+        from streaming_train import train_streaming
+        model_pipeline, X_train, y_train, X_test, y_test, stats = train_streaming(
+            args.data, args.chunksize, args.sample_size)
+    else:
+        model_pipeline, X_train, y_train, X_test, y_test = train_in_memory(args.data)
+        stats = None
 
-# Split data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Predict on test data to evaluate the model
+    y_pred = model_pipeline.predict(X_test)
 
-# Create a pipeline that first applies preprocessing, then trains the RandomForest model
-model_pipeline = Pipeline(steps=[
-    ('preprocessor', preprocessor),  # Apply preprocessing
-    ('classifier', RandomForestClassifier(n_estimators=100, random_state=42))  # Random Forest Classifier
-])
+    # Print classification report and accuracy score
+    print("Classification Report:")
+    print(classification_report(y_test, y_pred))
+    accuracy = accuracy_score(y_test, y_pred)
+    print("Accuracy Score:", accuracy)
 
-# Train the model
-model_pipeline.fit(X_train, y_train)
+    # Calibrate P(loan_status=1) and compare probability quality on the test data
+    calibration = fit_oob_calibration(model_pipeline, y_train, args.calibration)
+    raw_probability = model_pipeline.predict_proba(X_test)[:, list(model_pipeline.classes_).index(1)]
+    brier_raw = brier_score_loss(y_test, raw_probability)
+    brier_calibrated = brier_score_loss(y_test, apply_calibration(calibration, raw_probability))
+    print("Brier Score (raw):", brier_raw)
+    print(f"Brier Score ({calibration['method']}):", brier_calibrated)
 
-# Predict on test data to evaluate the model
-y_pred = model_pipeline.predict(X_test)
+    metrics = {'accuracy': float(accuracy), 'brier_raw': float(brier_raw), 'brier_calibrated': float(brier_calibrated),
+               'oob_score': float(model_pipeline[-1].oob_score_), 'n_train': int(len(y_train)),
+               'n_test': int(len(y_test))}
+    save_model(model_pipeline, args.output, args.compiled_output, calibration, metrics)
 
-# Print classification report and accuracy score
-print("Classification Report:")
-print(classification_report(y_test, y_pred))
-print("Accuracy Score:", accuracy_score(y_test, y_pred))
+    # Baseline for incremental updates and drift checks (see incremental.py), from the training
+    # rows only, so the held-out metrics above stay held out after updates
+    from incremental import BookState, state_path
+    BookState.build(X_train.assign(**{target: y_train}), stats, args.sample_size, metrics).save(state_path(args.output))
+    print(f"Incremental training state saved to '{state_path(args.output)}'")
 
-# Save the trained model to a pickle file
-with open('loan_model.pkl', 'wb') as model_file:
-    pickle.dump(model_pipeline, model_file)
 
-print("Model trained and saved as 'loan_model.pkl'")
+if __name__ == '__main__':
+    main()